@@ -14,11 +14,7 @@ env_path = Path(".") / ".env"
 load_dotenv(dotenv_path=env_path)
 
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Logging is configured by create_app
 logger = logging.getLogger(__name__)
 
 # Create the application
@@ -4,14 +4,22 @@ from pathlib import Path
 from dotenv import load_dotenv
 from flask import Flask
 from app.database import db
+from app.database.compression import init_compression
 from app.api import api_bp
 from app.slack.events import init_events
+from app.slack.directory import init_directory
+from app.scheduler import init_scheduler
+from app.alerts import init_alerts
+from app.dedup import init_dedup
+from app.activity import init_activity
+from app.stream import init_stream
+from app.trends import init_trends
+from app.logs import configure_logging
 
 env_path = Path(".") / ".env"
 load_dotenv(dotenv_path=env_path)
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -25,6 +33,16 @@ def create_app(test_config=None):
         SECRET_KEY=os.environ.get('SECRET_KEY', 'dev'),
         DATABASE_URI=os.environ.get('DATABASE_URI', 'sqlite:///messages.db'),
         SERVER_NAME=os.environ.get('SERVER_NAME'),
+        SCHEDULER_ENABLED=os.environ.get(
+            'SCHEDULER_ENABLED', '').lower() in ('1', 'true', 'yes'),
+        DIRECTORY_WARM_ON_START=os.environ.get(
+            'DIRECTORY_WARM_ON_START', '').lower() in ('1', 'true', 'yes'),
+        ALERT_TERMS_FILE=os.environ.get('ALERT_TERMS_FILE'),
+        ALERT_NOTIFY_CHANNEL=os.environ.get('ALERT_NOTIFY_CHANNEL'),
+        LOG_LEVEL=os.environ.get('LOG_LEVEL', 'INFO'),
+        LOG_FORMAT=os.environ.get('LOG_FORMAT', 'json'),
+        MESSAGE_COMPRESSION=os.environ.get(
+            'MESSAGE_COMPRESSION', '').lower() in ('1', 'true', 'yes'),
     )
 
     if test_config is None:
@@ -34,15 +52,42 @@ def create_app(test_config=None):
         # Load the test config if passed in
         app.config.from_mapping(test_config)
 
+    # Configure logging once, before anything else logs
+    configure_logging(app)
+
     # Initialize the database
     db.init_app(app)
 
+    # Enable compressed message storage, if configured
+    init_compression(app)
+
     # Register API blueprint
     app.register_blueprint(api_bp)
 
     # Initialize Slack Events API
     init_events(app)
 
+    # Initialize the user/channel directory cache
+    init_directory(app)
+
+    # Load watch terms for keyword alerts
+    init_alerts(app)
+
+    # Configure near-duplicate detection
+    init_dedup(app)
+
+    # Configure the per-channel activity index
+    init_activity(app)
+
+    # Configure the live message stream
+    init_stream(app)
+
+    # Restore the vibe trend tracker
+    init_trends(app)
+
+    # Initialize the campaign scheduler
+    init_scheduler(app)
+
     # Add a simple test route
     @app.route('/')
     def index():
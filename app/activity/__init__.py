@@ -0,0 +1,2 @@
+from app.activity.index import activity_index, record_activity, init_activity
+from app.activity.bitmap import RoaringBitmap
@@ -0,0 +1,207 @@
+"""
+A compact roaring-style bitmap of 32-bit unsigned integers
+"""
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+# Containers holding more values than this switch to a 65536-bit bitset
+ARRAY_MAX = 4096
+BITMAP_BYTES = 65536 // 8
+
+_ARRAY, _BITSET = 0, 1
+
+
+def _to_bits(container):
+    """Return a container as a Python int bitset"""
+    if isinstance(container, int):
+        return container
+    bits = 0
+    for value in container:
+        bits |= 1 << value
+    return bits
+
+
+def _iter_bits(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def _normalize(bits):
+    """Store sparse containers as sorted uint16 arrays and dense ones as bitsets"""
+    if bits.bit_count() > ARRAY_MAX:
+        return bits
+    return array("H", _iter_bits(bits))
+
+
+def _cardinality(container):
+    return container.bit_count() if isinstance(container, int) else len(container)
+
+
+class RoaringBitmap:
+    """
+    Set of unsigned 32-bit integers split into 2^16-value containers
+
+    Each container keeps the low 16 bits of its values either as a sorted
+    array of uint16 (sparse) or as a 65536-bit bitset (dense, more than 4096
+    values), so small and large sets both stay compact. Unions and
+    intersections work container by container.
+    """
+
+    __slots__ = ("_containers",)
+
+    def __init__(self, values=()):
+        self._containers = {}
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        """
+        Add a value
+
+        Returns:
+            bool: True if the value was not already present
+        """
+        key, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(key)
+
+        if container is None:
+            self._containers[key] = array("H", [low])
+            return True
+
+        if isinstance(container, int):
+            if container >> low & 1:
+                return False
+            self._containers[key] = container | (1 << low)
+            return True
+
+        pos = bisect_left(container, low)
+        if pos < len(container) and container[pos] == low:
+            return False
+
+        container.insert(pos, low)
+        if len(container) > ARRAY_MAX:
+            self._containers[key] = _to_bits(container)
+        return True
+
+    def __contains__(self, value):
+        container = self._containers.get(value >> 16)
+        if container is None:
+            return False
+
+        low = value & 0xFFFF
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+
+        pos = bisect_left(container, low)
+        return pos < len(container) and container[pos] == low
+
+    def __len__(self):
+        return sum(_cardinality(c) for c in self._containers.values())
+
+    def __iter__(self):
+        for key in sorted(self._containers):
+            container = self._containers[key]
+            values = _iter_bits(container) if isinstance(container, int) else container
+            base = key << 16
+            for low in values:
+                yield base | low
+
+    def __eq__(self, other):
+        return isinstance(other, RoaringBitmap) and list(self) == list(other)
+
+    def __or__(self, other):
+        result = RoaringBitmap()
+        for key in self._containers.keys() | other._containers.keys():
+            a, b = self._containers.get(key), other._containers.get(key)
+            if a is None or b is None:
+                container = a if b is None else b
+                result._containers[key] = container if isinstance(container, int) \
+                    else array("H", container)
+            else:
+                result._containers[key] = _normalize(_to_bits(a) | _to_bits(b))
+        return result
+
+    def __and__(self, other):
+        result = RoaringBitmap()
+        for key in self._containers.keys() & other._containers.keys():
+            bits = _to_bits(self._containers[key]) & _to_bits(other._containers[key])
+            if bits:
+                result._containers[key] = _normalize(bits)
+        return result
+
+    @classmethod
+    def union_all(cls, bitmaps):
+        """Union any number of bitmaps, merging each container once"""
+        merged = {}
+        for bitmap in bitmaps:
+            for key, container in bitmap._containers.items():
+                merged[key] = merged.get(key, 0) | _to_bits(container)
+
+        result = cls()
+        result._containers = {key: _normalize(bits) for key, bits in merged.items()}
+        return result
+
+    @classmethod
+    def intersect_all(cls, bitmaps):
+        """Intersect any number of bitmaps; an empty input gives an empty bitmap"""
+        bitmaps = list(bitmaps)
+        if not bitmaps:
+            return cls()
+
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            result = result & bitmap
+        return result
+
+    def to_bytes(self):
+        """
+        Serialize to bytes: a container count, then per container its key,
+        kind, value count and either little-endian uint16 values or the bitset
+        """
+        parts = [struct.pack("<I", len(self._containers))]
+
+        for key in sorted(self._containers):
+            container = self._containers[key]
+            if isinstance(container, int):
+                parts.append(struct.pack("<HBH", key, _BITSET, 0))
+                parts.append(container.to_bytes(BITMAP_BYTES, "little"))
+            else:
+                values = array("H", container)
+                if sys.byteorder == "big":
+                    values.byteswap()
+                parts.append(struct.pack("<HBH", key, _ARRAY, len(values)))
+                parts.append(values.tobytes())
+
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Deserialize a bitmap written by to_bytes"""
+        result = cls()
+        if not data:
+            return result
+
+        (count,) = struct.unpack_from("<I", data, 0)
+        offset = 4
+
+        for _ in range(count):
+            key, kind, length = struct.unpack_from("<HBH", data, offset)
+            offset += 5
+
+            if kind == _BITSET:
+                result._containers[key] = int.from_bytes(
+                    data[offset:offset + BITMAP_BYTES], "little")
+                offset += BITMAP_BYTES
+            else:
+                values = array("H")
+                values.frombytes(data[offset:offset + 2 * length])
+                if sys.byteorder == "big":
+                    values.byteswap()
+                result._containers[key] = values
+                offset += 2 * length
+
+        return result
@@ -0,0 +1,264 @@
+"""
+Bitmap activity index: which users were active in which channel, per hour
+
+Every Slack user gets a dense ordinal (UserOrdinal), and each (channel, hour)
+bucket stores a RoaringBitmap of the ordinals that posted in it. The index is
+updated as messages are stored, and only writes when a user is seen for the
+first time in a bucket. Heatmaps and distinct-user counts are then unions and
+intersections of a few bitmaps instead of DISTINCT scans over messages.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from sqlalchemy.exc import IntegrityError
+from app.activity.bitmap import RoaringBitmap
+from app.database.db import db, UserOrdinal, ActivityBitmap
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Conflicting concurrent updates of one bucket tolerated before giving up
+MAX_ATTEMPTS = 5
+
+
+def hour_of(seconds):
+    """Return the epoch-hour bucket of a Unix timestamp"""
+    return int(seconds) // 3600
+
+
+def hour_start(hour):
+    """Return the UTC start of an epoch-hour bucket"""
+    return datetime.fromtimestamp(hour * 3600, timezone.utc)
+
+
+class ActivityIndex:
+    """
+    Maintains the activity bitmaps as messages arrive
+
+    Args:
+        cache_size (int): Recent (channel, hour) bitmaps kept in memory, so
+            repeat posters in the current hour cost no database round trip
+    """
+
+    def __init__(self, cache_size=1024):
+        self.cache_size = cache_size
+        self._ordinals = {}
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._ordinals.clear()
+            self._recent.clear()
+
+    def ordinal_for(self, user_id):
+        """
+        Return the user's ordinal, allocating one if needed.
+        A new ordinal is flushed with the caller's transaction.
+        """
+        ordinal = self._ordinals.get(user_id)
+        if ordinal is not None:
+            return ordinal
+
+        row = UserOrdinal.query.filter_by(user_id=user_id).first()
+        if row is not None:
+            # Only committed ordinals are cached, so a rollback can never
+            # leave two users sharing a cached ordinal
+            self._ordinals[user_id] = row.ordinal
+            return row.ordinal
+
+        try:
+            # Savepoint, so losing the race to another worker keeps the transaction
+            with db.session.begin_nested():
+                row = UserOrdinal(user_id=user_id)
+                db.session.add(row)
+        except IntegrityError:
+            row = UserOrdinal.query.filter_by(user_id=user_id).one()
+        return row.ordinal
+
+    def _load_bucket(self, channel_id, hour):
+        return ActivityBitmap.query.filter_by(
+            channel_id=channel_id, hour=hour).populate_existing().first()
+
+    def record(self, user_id, channel_id, hour):
+        """
+        Mark a user active in a channel during an hour.
+        Commits its own transaction, so call it after the message is committed.
+
+        Other workers update the same buckets, so a new bucket is inserted in
+        a savepoint and an existing one is only overwritten if it still holds
+        the bitmap it was merged into; either conflict re-reads and retries.
+
+        Returns:
+            bool: True if this was the user's first activity in the bucket
+        """
+        key = (channel_id, hour)
+        ordinal = self.ordinal_for(user_id)
+
+        with self._lock:
+            cached = self._recent.get(key)
+            if cached is not None and ordinal in cached:
+                self._recent.move_to_end(key)
+                return False
+
+        for _ in range(MAX_ATTEMPTS):
+            row = self._load_bucket(channel_id, hour)
+            if row is None:
+                bitmap = RoaringBitmap([ordinal])
+                added = True
+                try:
+                    with db.session.begin_nested():
+                        db.session.add(ActivityBitmap(
+                            channel_id=channel_id, hour=hour, bitmap=bitmap.to_bytes()))
+                except IntegrityError:
+                    continue
+            else:
+                bitmap = RoaringBitmap.from_bytes(row.bitmap)
+                added = bitmap.add(ordinal)
+                if added and not ActivityBitmap.query.filter_by(
+                        id=row.id, bitmap=row.bitmap).update(
+                        {ActivityBitmap.bitmap: bitmap.to_bytes()},
+                        synchronize_session=False):
+                    continue
+            break
+        else:
+            db.session.rollback()
+            logger.warning(f"Gave up recording {user_id} in {channel_id} hour {hour} "
+                           f"after {MAX_ATTEMPTS} conflicting updates")
+            return False
+
+        db.session.commit()
+
+        # Cache only what is committed
+        with self._lock:
+            self._ordinals[user_id] = ordinal
+            self._recent[key] = bitmap
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.cache_size:
+                self._recent.popitem(last=False)
+
+        return added
+
+
+# Process-wide index - configured in init_activity
+activity_index = ActivityIndex()
+
+
+def record_activity(message):
+    """
+    Update the activity index for a stored message.
+    Commits its own transaction, after the message's.
+
+    Args:
+        message (Message): The message being stored
+    """
+    slack_ts = (message.message_metadata or {}).get("slack_ts")
+    try:
+        seconds = float(slack_ts) if slack_ts else time.time()
+    except ValueError:
+        seconds = time.time()
+
+    return activity_index.record(
+        message.user_id, message.channel_id, hour_of(seconds))
+
+
+def load_bitmaps(start_hour, end_hour, channel_id=None):
+    """
+    Load the bitmaps of the hours in [start_hour, end_hour)
+
+    Returns:
+        list: (channel_id, hour, RoaringBitmap) tuples ordered by hour
+    """
+    query = db.session.query(
+        ActivityBitmap.channel_id, ActivityBitmap.hour, ActivityBitmap.bitmap
+    ).filter(ActivityBitmap.hour >= start_hour, ActivityBitmap.hour < end_hour)
+
+    if channel_id:
+        query = query.filter(ActivityBitmap.channel_id == channel_id)
+
+    return [(channel, hour, RoaringBitmap.from_bytes(data))
+            for channel, hour, data in query.order_by(ActivityBitmap.hour).all()]
+
+
+def resolve_ordinals(bitmap):
+    """
+    Look up the Slack user IDs behind the ordinals in a bitmap
+
+    Resolve the union of a range once and map each bucket through the result,
+    rather than querying per bucket.
+
+    Returns:
+        dict: ordinal -> Slack user ID
+    """
+    ordinals = list(bitmap)
+    if not ordinals:
+        return {}
+
+    rows = UserOrdinal.query.filter(UserOrdinal.ordinal.in_(ordinals)).all()
+    return {row.ordinal: row.user_id for row in rows}
+
+
+def channel_heatmap(channel_id, start_hour, end_hour):
+    """
+    Hourly activity of a channel plus an hour-of-week profile
+
+    Returns:
+        dict: "hours" maps epoch hour -> bitmap, "by_hour_of_week" is a 7 x 24
+        grid (Monday first) of bitmaps unioned across weeks, and "all" is the
+        union over the whole range
+    """
+    hours = {hour: bitmap for _, hour, bitmap
+             in load_bitmaps(start_hour, end_hour, channel_id)}
+
+    slots = {}
+    for hour, bitmap in hours.items():
+        start = hour_start(hour)
+        slots.setdefault((start.weekday(), start.hour), []).append(bitmap)
+
+    by_hour_of_week = [
+        [RoaringBitmap.union_all(slots.get((day, hour), ())) for hour in range(24)]
+        for day in range(7)
+    ]
+
+    return {
+        "hours": hours,
+        "by_hour_of_week": by_hour_of_week,
+        "all": RoaringBitmap.union_all(hours.values())
+    }
+
+
+def daily_active_users(start_hour, end_hour, channel_id=None):
+    """
+    Distinct active users per UTC day, across one channel or all of them
+
+    Returns:
+        dict: "days" maps date -> bitmap of that day's users, "all" is the union
+        over the range and "every_day" the users active on every day of it
+    """
+    by_day = {}
+    for _, hour, bitmap in load_bitmaps(start_hour, end_hour, channel_id):
+        by_day.setdefault(hour_start(hour).date(), []).append(bitmap)
+
+    days = {day: RoaringBitmap.union_all(bitmaps) for day, bitmaps in by_day.items()}
+    day_count = (end_hour - start_hour + 23) // 24
+
+    return {
+        "days": days,
+        "all": RoaringBitmap.union_all(days.values()),
+        "every_day": RoaringBitmap.intersect_all(days.values())
+        if len(days) == day_count else RoaringBitmap()
+    }
+
+
+def init_activity(app):
+    """
+    Configure the activity index from the app config
+
+    Config keys: ACTIVITY_CACHE_SIZE, the number of recent (channel, hour)
+    bitmaps kept in memory (default 1024).
+    """
+    activity_index.cache_size = app.config.get('ACTIVITY_CACHE_SIZE', 1024)
+    activity_index.clear()
+    return app
@@ -0,0 +1,2 @@
+from app.alerts.keywords import keyword_watcher, scan_message, init_alerts
+from app.alerts.matcher import KeywordMatcher
@@ -0,0 +1,200 @@
+"""
+Keyword alerting: flag stored messages that contain watch terms
+
+Terms are compiled into a KeywordMatcher once and swapped in atomically when
+the term list changes, so ingest never waits on a rebuild. The term file holds
+one term or phrase per line, grouped under optional [category] headers:
+
+    # Lines starting with # are comments
+    [burnout]
+    burned out
+    exhausted
+    [incident]
+    outage
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from app.alerts.matcher import KeywordMatcher
+from app.database.db import db, Alert
+from slack.errors import SlackApiError
+from app.slack.client import slack_client
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def parse_terms(lines):
+    """
+    Parse a term list into (term, category) pairs
+
+    Args:
+        lines (iterable): Lines of the term file
+
+    Returns:
+        list: (term, category) pairs
+    """
+    terms = []
+    category = None
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            category = line[1:-1].strip() or None
+            continue
+        terms.append((line, category))
+
+    return terms
+
+
+class KeywordWatcher:
+    """Holds the live matcher and rebuilds it when the term file changes"""
+
+    def __init__(self):
+        self.matcher = KeywordMatcher([])
+        self.terms_file = None
+        self.notify_channel = None
+        self._mtime = None
+        self.reload_interval = 30
+        self._reload_lock = threading.Lock()
+        self._watch_thread = None
+        self._notifier = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='alert-notifier')
+
+    def load(self, terms):
+        """Compile a term list and swap it in; scans in flight keep the old matcher"""
+        matcher = KeywordMatcher(terms)
+        # A single reference assignment, so readers see the old or new matcher
+        self.matcher = matcher
+        logger.info(f"Loaded {len(matcher)} watch terms")
+        return matcher
+
+    def reload(self, force=False):
+        """
+        Rebuild the matcher from the term file if it changed since the last load
+
+        Returns:
+            bool: Whether a new matcher was loaded
+        """
+        if not self.terms_file:
+            return False
+
+        with self._reload_lock:
+            try:
+                mtime = os.stat(self.terms_file).st_mtime
+            except OSError as e:
+                logger.error(f"Cannot read watch terms file: {e}")
+                return False
+
+            if not force and mtime == self._mtime:
+                return False
+
+            with open(self.terms_file, encoding="utf-8") as f:
+                self.load(parse_terms(f))
+            self._mtime = mtime
+            return True
+
+    def watch(self, interval):
+        """Poll the term file for changes in a daemon thread"""
+        self.reload_interval = interval
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.reload_interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    # Keep watching; the next change to the file is picked up
+                    logger.error(f"Reloading watch terms failed: {e}")
+
+        self._watch_thread = threading.Thread(
+            target=loop, name='alert-terms-watcher', daemon=True)
+        self._watch_thread.start()
+
+    def notify(self, alerts):
+        """Post a summary of a message's alerts to the notify channel, off the request thread"""
+        if not self.notify_channel or not alerts:
+            return
+
+        first = alerts[0]
+        terms = ", ".join(sorted({alert.term for alert in alerts}))
+        text = (f":rotating_light: Watch terms ({terms}) in a message from "
+                f"<@{first.user_id}> in <#{first.channel_id}>")
+
+        def post():
+            # Posted directly rather than through send_message, so the summary
+            # is not stored as a message attributed to the flagged user
+            try:
+                slack_client.chat_postMessage(channel=self.notify_channel, text=text)
+            except SlackApiError as e:
+                logger.error(f"Error posting alert summary: {e.response['error']}")
+
+        self._notifier.submit(post)
+
+
+# Process-wide watcher - configured in init_alerts
+keyword_watcher = KeywordWatcher()
+
+
+def scan_message(message):
+    """
+    Scan a message for watch terms and stage an Alert per distinct term.
+    The caller is responsible for committing the session.
+
+    Args:
+        message (Message): The message being stored
+
+    Returns:
+        list: The staged Alert objects
+    """
+    # Read the reference once so a concurrent reload cannot split the scan
+    matcher = keyword_watcher.matcher
+    matches = matcher.find(message.message_text)
+    if not matches:
+        return []
+
+    occurrences = Counter(match.term for match in matches)
+
+    alerts = []
+    for term, count in occurrences.items():
+        alert = Alert(
+            message=message,
+            user_id=message.user_id,
+            channel_id=message.channel_id,
+            term=term,
+            category=matcher.terms[term],
+            occurrences=count
+        )
+        db.session.add(alert)
+        alerts.append(alert)
+
+    return alerts
+
+
+def init_alerts(app):
+    """
+    Load watch terms and start watching the term file
+
+    Config keys:
+    - ALERT_TERMS_FILE: Path of the term file, reloaded when it changes
+    - ALERT_TERMS: Inline list of terms, used when no file is configured
+    - ALERT_RELOAD_INTERVAL: Seconds between term file checks (default 30)
+    - ALERT_NOTIFY_CHANNEL: Channel ID to post alert summaries to (optional)
+    """
+    keyword_watcher.terms_file = app.config.get('ALERT_TERMS_FILE')
+    keyword_watcher.notify_channel = app.config.get('ALERT_NOTIFY_CHANNEL')
+
+    if keyword_watcher.terms_file:
+        keyword_watcher.reload(force=True)
+        keyword_watcher.watch(app.config.get('ALERT_RELOAD_INTERVAL', 30))
+    else:
+        keyword_watcher.load(parse_terms(app.config.get('ALERT_TERMS') or []))
+
+    return app
@@ -0,0 +1,122 @@
+"""
+Aho-Corasick multi-pattern matcher for watch terms
+"""
+from collections import deque, namedtuple
+
+Match = namedtuple("Match", ["term", "category", "start", "end"])
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordMatcher:
+    """
+    Compiled Aho-Corasick automaton over a fixed set of terms
+
+    Matching is case-insensitive and on whole words, so "ass" does not match
+    inside "class". A scan is a single pass over the text regardless of how
+    many terms are loaded. Instances are immutable once built, so a new
+    matcher can be swapped in while other threads are still scanning.
+
+    Args:
+        terms (iterable): (term, category) pairs; category may be None
+    """
+
+    def __init__(self, terms):
+        # Node 0 is the root; each node is a dict of char -> next node
+        self._goto = [{}]
+        self._fail = [0]
+        # Terms ending at each node, including those reached via failure links
+        self._out = [()]
+        self.terms = {}
+
+        for term, category in terms:
+            term = " ".join(term.lower().split())
+            if term and term not in self.terms:
+                self.terms[term] = category
+                self._add(term)
+
+        self._link()
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _add(self, term):
+        node = 0
+        for ch in term:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = next_node
+        self._out[node] = (term,)
+
+    def _link(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+
+                self._fail[child] = fail
+                self._out[child] = self._out[child] + self._out[fail]
+                queue.append(child)
+
+    def find(self, text):
+        """
+        Scan text once and return every whole-word term occurrence
+
+        Args:
+            text (str): The message text
+
+        Returns:
+            list: Match tuples in order of their end position
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        lowered = text.lower()
+        length = len(lowered)
+        matches = []
+        node = 0
+
+        for i, ch in enumerate(lowered):
+            # Runs of whitespace match the single spaces in stored phrases
+            if ch.isspace():
+                if i and lowered[i - 1].isspace():
+                    continue
+                ch = " "
+
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+
+            for term in out[node]:
+                if i + 1 < length and _is_word_char(lowered[i + 1]):
+                    continue
+                start = self._start_of(lowered, i, term)
+                if start > 0 and _is_word_char(lowered[start - 1]):
+                    continue
+                matches.append(Match(term, self.terms[term], start, i + 1))
+
+        return matches
+
+    @staticmethod
+    def _start_of(text, end, term):
+        """Walk back from the match end, collapsing whitespace runs like the scan does"""
+        pos = end
+        remaining = len(term)
+        while remaining:
+            if text[pos].isspace():
+                while pos > 0 and text[pos - 1].isspace():
+                    pos -= 1
+            remaining -= 1
+            pos -= 1
+        return pos + 1
@@ -1,8 +1,22 @@
 from pathlib import Path
 from dotenv import load_dotenv
-from flask import Blueprint, request, jsonify
-from app.slack import send_message
-from app.database.db import db, Message
+from flask import Blueprint, Response, current_app, request, jsonify
+from app.slack import send_message, warm_directory, lookup_users, lookup_channels
+from app.database.db import (
+    db, Message, Thread, Campaign, CampaignRun, Alert, TrendAnomaly
+)
+from app.alerts import keyword_watcher
+from app.dedup import duplicate_detector
+from app.activity.index import (
+    channel_heatmap, daily_active_users, resolve_ordinals, hour_of, hour_start
+)
+from app.stream import message_broker, SubscriberLimitError
+from app.trends import trend_tracker
+from app.trends.tracker import SCOPES
+import time
+from app.scheduler.audience import validate_audience
+from app.scheduler.cron import CronSchedule
+from datetime import datetime
 import logging
 import json
 
@@ -11,7 +25,6 @@ load_dotenv(dotenv_path=env_path)
 
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Create Blueprint
@@ -27,7 +40,8 @@ def send_message_endpoint():
     {
         "user_id": "U08J1P3FBRD", 
         "text": "Hello from the API!",
-        "channel_id": "C123456" (optional)
+        "channel_id": "C123456" (optional),
+        "thread_ts": "1712345678.000100" (optional, reply in a thread)
     }
     """
     data = request.json
@@ -46,7 +60,8 @@ def send_message_endpoint():
     result = send_message(
         user_id=data['user_id'],
         text=data['text'],
-        channel_id=data.get('channel_id')
+        channel_id=data.get('channel_id'),
+        thread_ts=data.get('thread_ts')
     )
 
     if result:
@@ -66,12 +81,19 @@ def get_messages():
     - limit: Maximum number of results to return (default 100)
     - offset: Offset for pagination (default 0)
     - direction: Filter by message direction (incoming/outgoing)
+    - expand: Comma-separated list of "user" and/or "channel" to include
+      names, display names and time zones from the directory cache
+    - collapse_duplicates: If true, return only the newest message of each
+      near-duplicate cluster, with a duplicate_count
     """
     user_id = request.args.get('user_id')
     channel_id = request.args.get('channel_id')
     direction = request.args.get('direction')
     limit = request.args.get('limit', 100, type=int)
     offset = request.args.get('offset', 0, type=int)
+    expand = set(filter(None, request.args.get('expand', '').split(',')))
+    collapse = request.args.get('collapse_duplicates', '').lower() in (
+        '1', 'true', 'yes')
 
     # Build query
     query = Message.query
@@ -83,20 +105,491 @@ def get_messages():
         query = query.filter(Message.channel_id == channel_id)
 
     if direction:
-        query = query.filter(
-            Message.message_metadata.contains({"direction": direction})
-        )
+        query = _filter_direction(query, direction)
 
-    # Get results with pagination
-    messages = query.order_by(Message.timestamp.desc()).limit(
-        limit).offset(offset).all()
+    if collapse:
+        # One row per cluster (unique messages are their own cluster)
+        clusters = query.with_entities(
+            db.func.max(Message.id).label('id'),
+            db.func.count().label('duplicate_count')
+        ).group_by(db.func.coalesce(Message.cluster_id, Message.id)).subquery()
+
+        rows = db.session.query(Message, clusters.c.duplicate_count).join(
+            clusters, Message.id == clusters.c.id
+        ).order_by(Message.timestamp.desc()).limit(limit).offset(offset).all()
+
+        result = []
+        for message, duplicate_count in rows:
+            entry = message.to_dict()
+            entry['duplicate_count'] = duplicate_count
+            result.append(entry)
+    else:
+        # Get results with pagination
+        messages = query.order_by(Message.timestamp.desc()).limit(
+            limit).offset(offset).all()
+
+        # Convert to dict format
+        result = [message.to_dict() for message in messages]
 
-    # Convert to dict format
-    result = [message.to_dict() for message in messages]
+    # Enrich from the directory cache; this never calls Slack
+    if 'user' in expand:
+        users = lookup_users(m['user_id'] for m in result)
+        for m in result:
+            m['user'] = users.get(m['user_id'])
+
+    if 'channel' in expand:
+        channels = lookup_channels(m['channel_id'] for m in result)
+        for m in result:
+            m['channel'] = channels.get(m['channel_id'])
 
     return jsonify({"count": len(result), "messages": result}), 200
 
 
+@api_bp.route('/channels/flood', methods=['GET'])
+def get_flood_metrics():
+    """API endpoint to report recent message and duplicate rates for every channel"""
+    metrics = duplicate_detector.flood_metrics()
+
+    return jsonify({"channels": metrics}), 200
+
+
+@api_bp.route('/channels/<channel_id>/flood', methods=['GET'])
+def get_channel_flood_metrics(channel_id):
+    """API endpoint to report recent message and duplicate rates for a channel"""
+    metrics = duplicate_detector.flood_metrics(channel_id).get(channel_id)
+
+    if metrics is None:
+        return jsonify({"channel_id": channel_id, "messages": 0, "duplicates": 0}), 200
+
+    return jsonify({"channel_id": channel_id, **metrics}), 200
+
+
+@api_bp.route('/channels/<channel_id>/activity', methods=['GET'])
+def get_channel_activity(channel_id):
+    """
+    API endpoint for a channel's hourly activity heatmap, served from the bitmap index
+
+    Query parameters:
+    - days: Number of days to cover, ending with the current hour (default 90)
+    - include_users: If true, list the active user IDs of each hour
+    """
+    days = request.args.get('days', 90, type=int)
+    include_users = request.args.get('include_users', '').lower() in (
+        '1', 'true', 'yes')
+
+    end_hour = hour_of(time.time()) + 1
+    heatmap = channel_heatmap(channel_id, end_hour - days * 24, end_hour)
+
+    # Every hour's users are in the range's union, so one lookup covers them all
+    user_ids = resolve_ordinals(heatmap["all"]) if include_users else {}
+
+    hours = []
+    for hour, bitmap in heatmap["hours"].items():
+        entry = {"hour": hour_start(hour).isoformat(), "active_users": len(bitmap)}
+        if include_users:
+            entry["user_ids"] = sorted(user_ids[ordinal] for ordinal in bitmap
+                                       if ordinal in user_ids)
+        hours.append(entry)
+
+    return jsonify({
+        "channel_id": channel_id,
+        "days": days,
+        "distinct_users": len(heatmap["all"]),
+        "hours": hours,
+        # Distinct users per weekday (Monday first) and hour of day, in UTC
+        "by_hour_of_week": [[len(bitmap) for bitmap in row]
+                            for row in heatmap["by_hour_of_week"]]
+    }), 200
+
+
+@api_bp.route('/activity/daily', methods=['GET'])
+def get_daily_active_users():
+    """
+    API endpoint for distinct active users per UTC day, served from the bitmap index
+
+    Query parameters:
+    - channel_id: Only count activity in this channel (default all channels)
+    - days: Number of days to cover, ending today (default 30)
+    """
+    channel_id = request.args.get('channel_id')
+    days = request.args.get('days', 30, type=int)
+
+    end_hour = (hour_of(time.time()) // 24 + 1) * 24
+    activity = daily_active_users(end_hour - days * 24, end_hour, channel_id)
+
+    return jsonify({
+        "channel_id": channel_id,
+        "days": [{"date": day.isoformat(), "active_users": len(bitmap)}
+                 for day, bitmap in sorted(activity["days"].items())],
+        "distinct_users": len(activity["all"]),
+        "active_every_day": len(activity["every_day"])
+    }), 200
+
+
+@api_bp.route('/directory/warm', methods=['POST'])
+def warm_directory_endpoint():
+    """API endpoint to bulk-load all users and channels into the directory cache"""
+    counts = warm_directory()
+
+    return jsonify({"success": True, **counts}), 200
+
+
+def _filter_direction(query, direction):
+    # Rows stored before the direction column existed are matched on
+    # their metadata (they predate compression, so it is always plain)
+    return query.filter(db.or_(
+        Message.direction == direction,
+        db.and_(Message.direction.is_(None),
+                db.cast(Message.message_metadata, db.Text).like(
+                    f'%"direction": "{direction}"%'))
+    ))
+
+
+def _sse_dropped(last_id):
+    # The id line also moves the browser's Last-Event-ID, so a plain
+    # EventSource reconnect resumes from the right place
+    return f"id: {last_id}\nevent: dropped\ndata: {json.dumps({'last_event_id': last_id})}\n\n"
+
+
+def _sse_event(message):
+    return f"id: {message['id']}\nevent: message\ndata: {json.dumps(message)}\n\n"
+
+
+@api_bp.route('/messages/stream', methods=['GET'])
+def stream_messages():
+    """
+    API endpoint that pushes newly stored messages as Server-Sent Events
+
+    Query parameters:
+    - user_id: Only stream messages for this user
+    - channel_id: Only stream messages in this channel
+    - direction: Only stream incoming or outgoing messages
+
+    Send the Last-Event-ID header (or a last_event_id query parameter) to replay
+    messages stored since that id before live streaming resumes. Clients that
+    fall too far behind receive a "dropped" event and should reconnect with the
+    last_event_id it carries. A replay is capped at STREAM_REPLAY_LIMIT messages;
+    a longer backlog is sent one page per connection, each ending in "dropped".
+    """
+    filters = {
+        'user_id': request.args.get('user_id'),
+        'channel_id': request.args.get('channel_id'),
+        'direction': request.args.get('direction'),
+    }
+    last_event_id = request.headers.get('Last-Event-ID') or \
+        request.args.get('last_event_id') or ''
+    last_event_id = int(last_event_id) if last_event_id.isdigit() else None
+    heartbeat = current_app.config.get('STREAM_HEARTBEAT', 15)
+    replay_limit = current_app.config.get('STREAM_REPLAY_LIMIT', 1000)
+
+    try:
+        # Subscribe before reading the backlog so nothing falls in between
+        subscription = message_broker.subscribe(**filters)
+    except SubscriberLimitError as e:
+        return jsonify({"error": str(e)}), 503
+
+    try:
+        backlog, replayed_upto, truncated = [], 0, False
+        if last_event_id is not None:
+            query = Message.query.filter(Message.id > last_event_id)
+            if filters['user_id']:
+                query = query.filter(Message.user_id == filters['user_id'])
+            if filters['channel_id']:
+                query = query.filter(Message.channel_id == filters['channel_id'])
+            if filters['direction']:
+                # Filtered in SQL so a full page always holds matching messages
+                query = _filter_direction(query, filters['direction'])
+            rows = query.order_by(Message.id).limit(replay_limit).all()
+            if rows:
+                replayed_upto = rows[-1].id
+            # Messages past a full page are neither replayed nor buffered live
+            truncated = len(rows) == replay_limit
+            backlog = [message.to_dict() for message in rows]
+    except Exception:
+        message_broker.unsubscribe(subscription)
+        raise
+
+    # The stream itself never touches the database
+    db.session.remove()
+
+    def generate():
+        last_id = replayed_upto or last_event_id or 0
+        try:
+            yield f"retry: {int(heartbeat * 1000)}\n\n"
+            for message in backlog:
+                yield _sse_event(message)
+
+            if truncated:
+                # Send the client back for the next page of the backlog
+                yield _sse_dropped(last_id)
+                return
+
+            while True:
+                messages = subscription.drain(heartbeat)
+                if subscription.dropped:
+                    yield _sse_dropped(last_id)
+                    return
+                if not messages:
+                    yield ": keep-alive\n\n"
+                    continue
+                for message in messages:
+                    # Already sent as part of the replayed backlog
+                    if message['id'] <= replayed_upto:
+                        continue
+                    last_id = message['id']
+                    yield _sse_event(message)
+        finally:
+            message_broker.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@api_bp.route('/threads/<channel_id>/<thread_ts>', methods=['GET'])
+def get_thread(channel_id, thread_ts):
+    """
+    API endpoint to retrieve a thread's parent message and all of its replies
+
+    The whole thread is read with a single range scan over the
+    (channel_id, thread_ts, timestamp) index.
+    """
+    messages = Message.query.filter(
+        Message.channel_id == channel_id,
+        Message.thread_ts == thread_ts
+    ).order_by(Message.timestamp.asc()).all()
+
+    if not messages:
+        return jsonify({"error": "Thread not found"}), 404
+
+    parent = None
+    replies = []
+    for message in messages:
+        # The root is the message whose own ts is the thread ts
+        if parent is None and \
+                (message.message_metadata or {}).get("slack_ts") == thread_ts:
+            parent = message
+        else:
+            replies.append(message)
+
+    return jsonify({
+        "channel_id": channel_id,
+        "thread_ts": thread_ts,
+        "parent": parent.to_dict() if parent else None,
+        "reply_count": len(replies),
+        "replies": [message.to_dict() for message in replies]
+    }), 200
+
+
+@api_bp.route('/channels/<channel_id>/threads', methods=['GET'])
+def get_channel_threads(channel_id):
+    """
+    API endpoint to list the threads of a channel, most recently active first
+
+    Query parameters:
+    - limit: Maximum number of results to return (default 100)
+    - offset: Offset for pagination (default 0)
+    """
+    limit = request.args.get('limit', 100, type=int)
+    offset = request.args.get('offset', 0, type=int)
+
+    # Reply counts are kept up to date on ingest, so no COUNT(*) is needed here
+    threads = Thread.query.filter(Thread.channel_id == channel_id).order_by(
+        Thread.last_reply_at.desc()).limit(limit).offset(offset).all()
+
+    result = [thread.to_dict() for thread in threads]
+
+    return jsonify({"count": len(result), "threads": result}), 200
+
+
+@api_bp.route('/campaigns', methods=['POST'])
+def create_campaign():
+    """
+    API endpoint to create a scheduled pulse-survey campaign
+
+    Expected JSON payload:
+    {
+        "name": "Weekly pulse",
+        "message_template": "Hi <@$user_id>, how are you feeling this week?",
+        "audience": {"type": "channel", "channel_id": "C123456"},
+        "schedule": "0 9 * * 1" (optional, cron-like; omit to send once),
+        "start_at": "2024-04-01T09:00:00" (optional, first run for one-off campaigns)
+    }
+
+    Audience types are "users" (with "user_ids"), "channel" (with "channel_id")
+    and "workspace".
+    """
+    data = request.json
+
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    for field in ('name', 'message_template', 'audience'):
+        if field not in data:
+            return jsonify({"error": f"{field} is required"}), 400
+
+    try:
+        validate_audience(data['audience'])
+
+        now = datetime.utcnow()
+        if data.get('start_at'):
+            next_run_at = datetime.fromisoformat(data['start_at'])
+        elif data.get('schedule'):
+            next_run_at = CronSchedule(data['schedule']).next_after(now)
+        else:
+            next_run_at = now
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    campaign = Campaign(
+        name=data['name'],
+        message_template=data['message_template'],
+        audience=data['audience'],
+        schedule=data.get('schedule'),
+        next_run_at=next_run_at
+    )
+    db.session.add(campaign)
+    db.session.commit()
+
+    return jsonify(campaign.to_dict()), 201
+
+
+@api_bp.route('/campaigns', methods=['GET'])
+def get_campaigns():
+    """API endpoint to list campaigns"""
+    campaigns = Campaign.query.order_by(Campaign.id).all()
+    result = [campaign.to_dict() for campaign in campaigns]
+
+    return jsonify({"count": len(result), "campaigns": result}), 200
+
+
+@api_bp.route('/campaigns/<int:campaign_id>', methods=['GET'])
+def get_campaign(campaign_id):
+    """API endpoint to show a campaign with per-run delivery progress"""
+    campaign = db.session.get(Campaign, campaign_id)
+
+    if not campaign:
+        return jsonify({"error": "Campaign not found"}), 404
+
+    result = campaign.to_dict()
+    result["runs"] = [run.to_dict()
+                      for run in campaign.runs.order_by(CampaignRun.id)]
+
+    return jsonify(result), 200
+
+
+@api_bp.route('/campaigns/<int:campaign_id>/run', methods=['POST'])
+def trigger_campaign(campaign_id):
+    """API endpoint to fire a campaign on the next scheduler tick"""
+    campaign = db.session.get(Campaign, campaign_id)
+
+    if not campaign:
+        return jsonify({"error": "Campaign not found"}), 404
+
+    campaign.active = True
+    campaign.next_run_at = datetime.utcnow()
+    db.session.commit()
+
+    return jsonify(campaign.to_dict()), 200
+
+
+@api_bp.route('/alerts', methods=['GET'])
+def get_alerts():
+    """
+    API endpoint to retrieve watch-term alerts, newest first
+
+    Query parameters:
+    - category: Filter by term category
+    - channel_id: Filter by channel ID
+    - user_id: Filter by user ID
+    - limit: Maximum number of results to return (default 100)
+    - offset: Offset for pagination (default 0)
+    """
+    category = request.args.get('category')
+    channel_id = request.args.get('channel_id')
+    user_id = request.args.get('user_id')
+    limit = request.args.get('limit', 100, type=int)
+    offset = request.args.get('offset', 0, type=int)
+
+    query = Alert.query
+
+    if category:
+        query = query.filter(Alert.category == category)
+
+    if channel_id:
+        query = query.filter(Alert.channel_id == channel_id)
+
+    if user_id:
+        query = query.filter(Alert.user_id == user_id)
+
+    alerts = query.order_by(Alert.created_at.desc()).limit(
+        limit).offset(offset).all()
+
+    result = [alert.to_dict() for alert in alerts]
+
+    return jsonify({"count": len(result), "alerts": result}), 200
+
+
+@api_bp.route('/alerts/reload', methods=['POST'])
+def reload_alert_terms():
+    """API endpoint to reload the watch-term file immediately"""
+    reloaded = keyword_watcher.reload(force=True)
+
+    return jsonify({"reloaded": reloaded, "terms": len(keyword_watcher.matcher)}), 200
+
+
+@api_bp.route('/trends/anomalies', methods=['GET'])
+def get_trend_anomalies():
+    """
+    API endpoint to retrieve detected vibe and activity drops, newest first
+
+    Query parameters:
+    - scope: "user" or "channel"
+    - entity_id: Filter by user or channel ID
+    - metric: "vibe" or "activity"
+    - limit: Maximum number of results to return (default 100)
+    - offset: Offset for pagination (default 0)
+    """
+    scope = request.args.get('scope')
+    entity_id = request.args.get('entity_id')
+    metric = request.args.get('metric')
+    limit = request.args.get('limit', 100, type=int)
+    offset = request.args.get('offset', 0, type=int)
+
+    query = TrendAnomaly.query
+
+    if scope:
+        query = query.filter(TrendAnomaly.scope == scope)
+
+    if entity_id:
+        query = query.filter(TrendAnomaly.entity_id == entity_id)
+
+    if metric:
+        query = query.filter(TrendAnomaly.metric == metric)
+
+    anomalies = query.order_by(TrendAnomaly.created_at.desc()).limit(
+        limit).offset(offset).all()
+
+    result = [anomaly.to_dict() for anomaly in anomalies]
+
+    return jsonify({"count": len(result), "anomalies": result}), 200
+
+
+@api_bp.route('/trends/<scope>/<entity_id>', methods=['GET'])
+def get_trend_state(scope, entity_id):
+    """API endpoint for a user's or channel's current vibe and activity trend"""
+    if scope not in SCOPES:
+        return jsonify({"error": "scope must be user or channel"}), 400
+
+    state = trend_tracker.state(scope, entity_id)
+
+    if state is None:
+        return jsonify({"error": f"No trend data for {scope} {entity_id}"}), 404
+
+    return jsonify({"scope": scope, "entity_id": entity_id, **state}), 200
+
+
 @api_bp.route('/test', methods=['GET'])
 def test_endpoint():
     """Simple test endpoint to verify the API is working"""
@@ -0,0 +1,459 @@
+"""
+Optional zstd compression of stored message text and metadata
+
+Slack text is very repetitive (greetings, templates, our own pulse messages),
+so a zstd dictionary trained on recent messages shrinks rows far more than
+plain compression of each short message could. Without a dictionary the zstd
+frame overhead makes short messages larger, so rows are only compressed once
+a dictionary exists.
+
+While MESSAGE_COMPRESSION is enabled, messages are written to the
+compressed_text and compressed_metadata blob columns (a 4-byte dictionary id
+followed by a zstd frame) with message_text left empty, and are decompressed
+transparently when Message.message_text and Message.message_metadata are read.
+Compressed rows stay readable after compression is switched off: the job then
+rewrites them as plain rows. Startup fails if compressed rows exist but
+zstandard is not installed.
+
+A background job, run at startup and then periodically, trains a new
+dictionary when the newest one is older than the job interval and recompresses
+older rows that are still plain or use an older dictionary. Each dictionary
+records the one it replaced, under a unique index, so when several workers
+train at once only one of them stores a dictionary. Old dictionaries are kept until no row references them and every worker has had
+a run to switch to the newest one.
+
+Compressed values cannot be matched in SQL, so filters on message content must
+go through dedicated columns (like Message.direction) rather than LIKE on
+message_text or message_metadata.
+"""
+import json
+import logging
+import struct
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency - compression stays off without it
+    zstandard = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Dictionary id prefix of every compressed value
+HEADER = struct.Struct("<I")
+
+# Too few samples make zstd dictionary training fail or overfit
+MIN_TRAINING_SAMPLES = 100
+
+
+class MessageCodec:
+    """
+    Compresses and decompresses column values with the stored dictionaries
+
+    zstd compressors are not thread-safe, so each thread builds its own from
+    the shared dictionary bytes. Dictionaries missing from the in-process cache
+    (for example, trained by another worker) are loaded from the database on
+    first use.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.level = 3
+        self.current_id = None
+        self._dictionaries = {}
+        self._generation = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def configure(self, enabled, level=3):
+        """Apply new settings, forgetting all cached dictionaries"""
+        with self._lock:
+            self.enabled = enabled
+            self.level = level
+            self.current_id = None
+            self._dictionaries = {}
+            self._generation += 1
+
+    def add_dictionary(self, dict_id, data, current=False):
+        """Cache a dictionary, optionally making it the one new values use"""
+        with self._lock:
+            self._dictionaries[dict_id] = data
+            if current:
+                self.current_id = dict_id
+
+    def _dictionary(self, dict_id):
+        data = self._dictionaries.get(dict_id)
+        if data is None:
+            data = _load_dictionary(dict_id)
+            if data is None:
+                raise ValueError(f"Unknown compression dictionary {dict_id}")
+            self.add_dictionary(dict_id, data)
+        return data
+
+    def _codecs(self, dict_id):
+        """Return this thread's (compressor, decompressor) pair for a dictionary"""
+        cache = getattr(self._local, "cache", None)
+        if cache is None or self._local.generation != self._generation:
+            cache = self._local.cache = {}
+            self._local.generation = self._generation
+
+        pair = cache.get(dict_id)
+        if pair is None:
+            zdict = zstandard.ZstdCompressionDict(self._dictionary(dict_id))
+            pair = (zstandard.ZstdCompressor(level=self.level, dict_data=zdict),
+                    zstandard.ZstdDecompressor(dict_data=zdict))
+            cache[dict_id] = pair
+        return pair
+
+    def compress(self, data):
+        """Compress bytes with the current dictionary"""
+        dict_id = self.current_id
+        compressor, _ = self._codecs(dict_id)
+        return HEADER.pack(dict_id) + compressor.compress(data)
+
+    def decompress(self, blob):
+        """Decompress a value written by compress"""
+        (dict_id,) = HEADER.unpack_from(blob)
+        _, decompressor = self._codecs(dict_id)
+        return decompressor.decompress(blob[HEADER.size:])
+
+
+# Process-wide codec - configured in init_compression
+codec = MessageCodec()
+
+
+def _load_dictionary(dict_id):
+    from app.database.db import db, CompressionDictionary
+
+    with db.session.no_autoflush:
+        return db.session.query(CompressionDictionary.data).filter(
+            CompressionDictionary.id == dict_id).scalar()
+
+
+def compress_message(message):
+    """
+    Move a plain message into the blob columns, compressed with the current
+    dictionary, if compression is enabled and a dictionary has been trained.
+    Called from the Message flush hooks.
+    """
+    if not codec.enabled or codec.current_id is None \
+            or message.compression_dict_id is not None:
+        return
+
+    message.compressed_text = codec.compress(message._message_text.encode("utf-8"))
+    if message._message_metadata is not None:
+        message.compressed_metadata = codec.compress(
+            json.dumps(message._message_metadata).encode("utf-8"))
+    message._message_text = ""
+    message._message_metadata = None
+    message.compression_dict_id = codec.current_id
+
+
+def train_dictionary(sample_size=5000, dict_size=32768, max_age=None):
+    """
+    Train a dictionary on the most recent messages and make it current
+
+    If another worker stores a dictionary while this one trains, that one is
+    kept and made current instead.
+
+    Args:
+        sample_size (int): Number of recent messages sampled
+        dict_size (int): Target dictionary size in bytes
+        max_age (int): Skip training while the newest dictionary is younger
+            than this many seconds (default: always train)
+
+    Returns:
+        CompressionDictionary: The stored dictionary, or None if training was
+        skipped, there were too few messages to train on or another worker
+        trained first
+    """
+    from app.database.db import db, Message, CompressionDictionary
+
+    # Re-read right before training, so a dictionary another worker has just
+    # stored is not trained again
+    latest = latest_dictionary()
+    if latest is not None and max_age is not None and \
+            latest.created_at > datetime.utcnow() - timedelta(seconds=max_age):
+        return None
+
+    rows = Message.query.order_by(Message.id.desc()).limit(sample_size).all()
+
+    samples = [message.message_text.encode("utf-8") for message in rows]
+    samples += [json.dumps(message.message_metadata).encode("utf-8")
+                for message in rows if message.message_metadata is not None]
+
+    if len(rows) < MIN_TRAINING_SAMPLES:
+        logger.info(f"Skipping dictionary training: only {len(rows)} messages")
+        return None
+
+    try:
+        trained = zstandard.train_dictionary(dict_size, samples)
+    except zstandard.ZstdError as e:
+        logger.error(f"Dictionary training failed: {e}")
+        return None
+
+    dictionary = CompressionDictionary(
+        data=trained.as_bytes(), sample_count=len(samples),
+        replaces_id=latest.id if latest is not None else 0)
+    try:
+        with db.session.begin_nested():
+            db.session.add(dictionary)
+        db.session.commit()
+    except IntegrityError:
+        # Another worker replaced the same dictionary while this one trained
+        db.session.rollback()
+        winner = latest_dictionary()
+        codec.add_dictionary(winner.id, winner.data, current=True)
+        logger.info(f"Using compression dictionary {winner.id} trained by another worker")
+        return None
+
+    codec.add_dictionary(dictionary.id, dictionary.data, current=True)
+    logger.info(f"Trained compression dictionary {dictionary.id} "
+                f"({len(dictionary.data)} bytes from {len(samples)} samples)")
+    return dictionary
+
+
+def recompress_messages(before, batch_size=500):
+    """
+    Rewrite messages older than a cutoff that are stored plain or with an
+    older dictionary than the current one, committing one batch at a time.
+    Rows using a newer dictionary (from a worker that has already switched)
+    are left alone.
+
+    Args:
+        before (datetime): Only messages stored before this time are rewritten
+        batch_size (int): Messages per transaction
+
+    Returns:
+        int: Number of messages rewritten
+    """
+    from sqlalchemy.orm.attributes import flag_modified
+    from app.database.db import db, Message
+
+    if not codec.enabled or codec.current_id is None:
+        return 0
+
+    total, last_id = 0, 0
+    while True:
+        messages = Message.query.filter(
+            Message.id > last_id,
+            Message.timestamp < before,
+            db.or_(Message.compression_dict_id.is_(None),
+                   Message.compression_dict_id < codec.current_id)
+        ).order_by(Message.id).limit(batch_size).all()
+
+        if not messages:
+            return total
+
+        for message in messages:
+            message.store_plain()
+            flag_modified(message, "_message_text")
+            if message.direction is None:
+                message.direction = (message.message_metadata or {}).get("direction")
+
+        db.session.commit()
+        total += len(messages)
+        last_id = messages[-1].id
+
+
+def decompress_messages(batch_size=500):
+    """
+    Rewrite compressed messages as plain rows, committing one batch at a time.
+    Does nothing while compression is enabled.
+
+    Args:
+        batch_size (int): Messages per transaction
+
+    Returns:
+        int: Number of messages rewritten
+    """
+    from app.database.db import db, Message
+
+    if codec.enabled:
+        return 0
+
+    total = 0
+    while True:
+        messages = Message.query.filter(
+            Message.compression_dict_id.isnot(None)
+        ).order_by(Message.id).limit(batch_size).all()
+
+        if not messages:
+            return total
+
+        for message in messages:
+            message.store_plain()
+
+        db.session.commit()
+        total += len(messages)
+
+
+def latest_dictionary():
+    """Return the most recently trained dictionary, or None"""
+    from app.database.db import CompressionDictionary
+
+    return CompressionDictionary.query.order_by(
+        CompressionDictionary.id.desc()).first()
+
+
+def prune_dictionaries(settle_time=0):
+    """
+    Delete dictionaries no message uses any more
+
+    The newest dictionary is kept while compression is enabled, and nothing is
+    deleted until it is at least settle_time seconds old: other workers keep
+    compressing with an older dictionary until their own job run switches
+    them to the newest one.
+
+    Args:
+        settle_time (int): Seconds every worker needs to adopt a new dictionary
+
+    Returns:
+        int: Number of dictionaries deleted
+    """
+    from app.database.db import db, Message, CompressionDictionary
+
+    latest = latest_dictionary()
+    if latest is None or latest.created_at > datetime.utcnow() - timedelta(seconds=settle_time):
+        return 0
+
+    used = db.session.query(Message.compression_dict_id).filter(
+        Message.compression_dict_id.isnot(None)).distinct()
+
+    query = CompressionDictionary.query.filter(CompressionDictionary.id.notin_(used))
+    if codec.enabled:
+        query = query.filter(CompressionDictionary.id != latest.id)
+
+    deleted = query.delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+class CompressionJob:
+    """
+    Background job that retrains the dictionary and recompresses older rows
+
+    Configuration (Flask config keys):
+    - COMPRESSION_JOB_INTERVAL: Seconds between runs (default 86400; 0 disables the job)
+    - COMPRESSION_RECOMPRESS_AFTER: Age in seconds before a row is recompressed (default 86400)
+    - COMPRESSION_TRAIN_SAMPLES: Recent messages sampled for training (default 5000)
+    - COMPRESSION_DICT_SIZE: Dictionary size in bytes (default 32768)
+    - COMPRESSION_BATCH_SIZE: Rows rewritten per transaction (default 500)
+    """
+
+    def __init__(self, app):
+        self.app = app
+        config = app.config
+        self.interval = config.get('COMPRESSION_JOB_INTERVAL', 86400)
+        self.recompress_after = config.get('COMPRESSION_RECOMPRESS_AFTER', 86400)
+        self.sample_size = config.get('COMPRESSION_TRAIN_SAMPLES', 5000)
+        self.dict_size = config.get('COMPRESSION_DICT_SIZE', 32768)
+        self.batch_size = config.get('COMPRESSION_BATCH_SIZE', 500)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the job loop in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name='message-compression', daemon=True)
+        self._thread.start()
+        logger.info("Message compression job started")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _loop(self):
+        # First run at startup, so new rows are compressed without waiting a
+        # whole interval for the first dictionary
+        while not self._stop.is_set():
+            try:
+                self.run()
+            except Exception as e:
+                logger.error(f"Message compression job failed: {e}")
+            self._stop.wait(self.interval)
+
+    def run(self):
+        """
+        Switch to the newest dictionary (training one if it is older than the
+        job interval), recompress older rows and prune unused dictionaries.
+        With compression disabled, rewrite compressed rows as plain instead.
+
+        Returns:
+            int: Number of messages rewritten
+        """
+        with self.app.app_context():
+            if not codec.enabled:
+                rewritten = decompress_messages(self.batch_size)
+                pruned = prune_dictionaries()
+                logger.info(f"Decompressed {rewritten} messages, "
+                            f"pruned {pruned} dictionaries")
+                return rewritten
+
+            latest = latest_dictionary()
+            if latest is not None:
+                codec.add_dictionary(latest.id, latest.data, current=True)
+            train_dictionary(self.sample_size, self.dict_size, max_age=self.interval)
+
+            before = datetime.utcnow() - timedelta(seconds=self.recompress_after)
+            rewritten = recompress_messages(before, self.batch_size)
+            pruned = prune_dictionaries(self.interval)
+            logger.info(f"Recompressed {rewritten} messages, "
+                        f"pruned {pruned} dictionaries")
+            return rewritten
+
+
+def init_compression(app):
+    """
+    Configure message compression from the app config
+
+    Config keys: MESSAGE_COMPRESSION enables compressed storage (default off;
+    needs the zstandard package), COMPRESSION_LEVEL (default 3), plus the
+    CompressionJob settings. With compression off, the job still runs while
+    compressed rows remain, to rewrite them as plain rows.
+
+    Raises:
+        RuntimeError: If the database holds compressed messages but zstandard
+            is not installed to read them
+    """
+    from app.database.db import db, Message
+
+    enabled = bool(app.config.get('MESSAGE_COMPRESSION'))
+
+    with app.app_context():
+        compressed = db.session.query(Message.id).filter(
+            Message.compression_dict_id.isnot(None)).limit(1).scalar() is not None
+
+    if zstandard is None:
+        if compressed:
+            raise RuntimeError("The database holds compressed messages but the "
+                               "zstandard package is not installed; install it "
+                               "to read them")
+        if enabled:
+            logger.warning("MESSAGE_COMPRESSION is set but zstandard is not installed; "
+                           "storing messages uncompressed")
+            enabled = False
+
+    codec.configure(enabled, app.config.get('COMPRESSION_LEVEL', 3))
+    if not enabled and not compressed:
+        return app
+
+    if enabled:
+        with app.app_context():
+            latest = latest_dictionary()
+            if latest is not None:
+                codec.add_dictionary(latest.id, latest.data, current=True)
+
+    job = CompressionJob(app)
+    app.extensions['compression_job'] = job
+    if job.interval:
+        job.start()
+
+    return app
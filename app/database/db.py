@@ -1,10 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.hybrid import hybrid_property
 from datetime import datetime
+import json
+import logging
 import os
 from pathlib import Path
+from app.database.compression import codec, compress_message
 
 db = SQLAlchemy()
 
+# Set up logging
+logger = logging.getLogger(__name__)
+
 
 class Message(db.Model):
     __tablename__ = 'messages'
@@ -12,13 +21,77 @@ class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(50), nullable=False)
     channel_id = db.Column(db.String(50), nullable=False)
-    message_text = db.Column(db.Text, nullable=False)
+    # Read and written through the message_text and message_metadata
+    # properties; empty while the message is stored compressed
+    _message_text = db.Column('message_text', db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-    message_metadata = db.Column(db.JSON, nullable=True)
+    _message_metadata = db.Column('message_metadata', db.JSON, nullable=True)
+    # zstd blobs of the text and metadata when MESSAGE_COMPRESSION is enabled
+    compressed_text = db.Column(db.LargeBinary, nullable=True)
+    compressed_metadata = db.Column(db.LargeBinary, nullable=True)
+    # "incoming" or "outgoing"; a column so it can be filtered without
+    # reading (possibly compressed) metadata
+    direction = db.Column(db.String(10), nullable=True, index=True)
+    # Dictionary the blobs are compressed with; NULL for plain rows
+    compression_dict_id = db.Column(db.Integer, nullable=True, index=True)
+    # Slack event that delivered an incoming message, so redeliveries are skipped
+    event_id = db.Column(db.String(50), nullable=True, unique=True, index=True)
+    # Slack ts of the thread root; top-level messages use their own ts so a
+    # thread (parent + replies) is one contiguous range of this index
+    thread_ts = db.Column(db.String(50), nullable=True)
+    parent_user_id = db.Column(db.String(50), nullable=True, index=True)
+    # Id of the first message of a near-duplicate cluster; NULL when unique
+    cluster_id = db.Column(db.Integer, nullable=True, index=True)
+
+    __table_args__ = (
+        db.Index('ix_messages_channel_thread',
+                 'channel_id', 'thread_ts', 'timestamp'),
+    )
 
     def __repr__(self):
         return f'<Message {self.id} to {self.user_id}>'
 
+    @hybrid_property
+    def message_text(self):
+        if self.compressed_text is not None:
+            return codec.decompress(self.compressed_text).decode('utf-8')
+        return self._message_text
+
+    @message_text.setter
+    def message_text(self, value):
+        self.store_plain()
+        self._message_text = value
+
+    @message_text.expression
+    def message_text(cls):
+        # SQL filters only see plain rows
+        return cls._message_text
+
+    @hybrid_property
+    def message_metadata(self):
+        if self.compressed_metadata is not None:
+            return json.loads(codec.decompress(self.compressed_metadata))
+        return self._message_metadata
+
+    @message_metadata.setter
+    def message_metadata(self, value):
+        self.store_plain()
+        self._message_metadata = value
+
+    @message_metadata.expression
+    def message_metadata(cls):
+        return cls._message_metadata
+
+    def store_plain(self):
+        """Move a compressed message back into the plain columns on the next flush"""
+        if self.compression_dict_id is None:
+            return
+
+        text, metadata = self.message_text, self.message_metadata
+        self.compressed_text = self.compressed_metadata = None
+        self.compression_dict_id = None
+        self._message_text, self._message_metadata = text, metadata
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -26,20 +99,429 @@ class Message(db.Model):
             'channel_id': self.channel_id,
             'message_text': self.message_text,
             'timestamp': self.timestamp.isoformat(),
-            'metadata': self.message_metadata
+            'metadata': self.message_metadata,
+            'thread_ts': self.thread_ts,
+            'parent_user_id': self.parent_user_id,
+            'cluster_id': self.cluster_id
+        }
+
+
+@event.listens_for(Message, 'before_insert')
+def _compress_new_message(mapper, connection, target):
+    compress_message(target)
+
+
+@event.listens_for(Message, 'before_update')
+def _compress_rewritten_message(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if attrs._message_text.history.has_changes() or \
+            attrs._message_metadata.history.has_changes():
+        compress_message(target)
+
+
+class Thread(db.Model):
+    """Per-thread summary with an incrementally maintained reply count"""
+    __tablename__ = 'threads'
+
+    id = db.Column(db.Integer, primary_key=True)
+    channel_id = db.Column(db.String(50), nullable=False)
+    thread_ts = db.Column(db.String(50), nullable=False)
+    parent_user_id = db.Column(db.String(50), nullable=True)
+    reply_count = db.Column(db.Integer, nullable=False, default=0)
+    last_reply_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('channel_id', 'thread_ts',
+                            name='uq_threads_channel_thread'),
+        db.Index('ix_threads_channel_last_reply',
+                 'channel_id', 'last_reply_at'),
+    )
+
+    def __repr__(self):
+        return f'<Thread {self.thread_ts} in {self.channel_id}>'
+
+    def to_dict(self):
+        return {
+            'channel_id': self.channel_id,
+            'thread_ts': self.thread_ts,
+            'parent_user_id': self.parent_user_id,
+            'reply_count': self.reply_count,
+            'last_reply_at': self.last_reply_at.isoformat() if self.last_reply_at else None
+        }
+
+    @classmethod
+    def record_reply(cls, channel_id, thread_ts, parent_user_id=None, replied_at=None):
+        """
+        Bump the reply count of a thread, creating the summary row on the first reply.
+        The caller is responsible for committing the session.
+
+        Args:
+            channel_id (str): The channel the thread lives in
+            thread_ts (str): The Slack ts of the thread root
+            parent_user_id (str, optional): The author of the thread root
+            replied_at (datetime, optional): When the reply was stored
+        """
+        replied_at = replied_at or datetime.utcnow()
+
+        if cls._bump(channel_id, thread_ts, replied_at):
+            return
+
+        try:
+            # Savepoint, so a conflicting insert does not roll back the reply itself
+            with db.session.begin_nested():
+                db.session.add(cls(
+                    channel_id=channel_id,
+                    thread_ts=thread_ts,
+                    parent_user_id=parent_user_id,
+                    reply_count=1,
+                    last_reply_at=replied_at
+                ))
+        except IntegrityError:
+            # A concurrent first reply created the row after our UPDATE missed it
+            cls._bump(channel_id, thread_ts, replied_at)
+
+    @classmethod
+    def _bump(cls, channel_id, thread_ts, replied_at):
+        # Single atomic UPDATE so concurrent replies never lose an increment
+        return cls.query.filter_by(
+            channel_id=channel_id, thread_ts=thread_ts
+        ).update({
+            cls.reply_count: cls.reply_count + 1,
+            cls.last_reply_at: replied_at
+        }, synchronize_session=False)
+
+
+class Campaign(db.Model):
+    """A pulse-survey campaign: who to ask, what to send and when"""
+    __tablename__ = 'campaigns'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    message_template = db.Column(db.Text, nullable=False)
+    # e.g. {"type": "users", "user_ids": [...]}, {"type": "channel", "channel_id": "C1"}
+    audience = db.Column(db.JSON, nullable=False)
+    # Cron-like expression; None means the campaign fires once
+    schedule = db.Column(db.String(100), nullable=True)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    next_run_at = db.Column(db.DateTime, nullable=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    runs = db.relationship('CampaignRun', backref='campaign', lazy='dynamic')
+
+    def __repr__(self):
+        return f'<Campaign {self.id} {self.name}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'message_template': self.message_template,
+            'audience': self.audience,
+            'schedule': self.schedule,
+            'active': self.active,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class CampaignRun(db.Model):
+    """One firing of a campaign, with its audience expansion checkpoint"""
+    __tablename__ = 'campaign_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'),
+                            nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False,
+                       default='running', index=True)
+    # Where the next audience chunk starts (Slack cursor or list offset)
+    audience_cursor = db.Column(db.String(255), nullable=True)
+    audience_exhausted = db.Column(db.Boolean, nullable=False, default=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<CampaignRun {self.id} of campaign {self.campaign_id}>'
+
+    def to_dict(self):
+        counts = dict(
+            db.session.query(CampaignDelivery.status, db.func.count())
+            .filter(CampaignDelivery.run_id == self.id)
+            .group_by(CampaignDelivery.status).all()
+        )
+        return {
+            'id': self.id,
+            'campaign_id': self.campaign_id,
+            'status': self.status,
+            'audience_exhausted': self.audience_exhausted,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'deliveries': counts
+        }
+
+
+class CampaignDelivery(db.Model):
+    """Per-recipient progress of a campaign run"""
+    __tablename__ = 'campaign_deliveries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('campaign_runs.id'),
+                       nullable=False)
+    user_id = db.Column(db.String(50), nullable=False)
+    # pending -> sending -> sent, or back to pending / failed on error
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('run_id', 'user_id',
+                            name='uq_campaign_deliveries_run_user'),
+        db.Index('ix_campaign_deliveries_run_status',
+                 'run_id', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f'<CampaignDelivery {self.user_id} in run {self.run_id}>'
+
+
+class SlackUser(db.Model):
+    """Cached Slack user profile, kept fresh from users.list and user_change"""
+    __tablename__ = 'slack_users'
+
+    user_id = db.Column(db.String(50), primary_key=True)
+    name = db.Column(db.String(255), nullable=True)
+    real_name = db.Column(db.String(255), nullable=True)
+    display_name = db.Column(db.String(255), nullable=True)
+    tz = db.Column(db.String(100), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow,
+                           onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SlackUser {self.user_id} {self.name}>'
+
+    def to_dict(self):
+        return {
+            'id': self.user_id,
+            'name': self.name,
+            'real_name': self.real_name,
+            'display_name': self.display_name,
+            'tz': self.tz
+        }
+
+
+class SlackChannel(db.Model):
+    """Cached Slack channel info, kept fresh from conversations.list and channel_rename"""
+    __tablename__ = 'slack_channels'
+
+    channel_id = db.Column(db.String(50), primary_key=True)
+    name = db.Column(db.String(255), nullable=True)
+    is_private = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow,
+                           onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SlackChannel {self.channel_id} {self.name}>'
+
+    def to_dict(self):
+        return {
+            'id': self.channel_id,
+            'name': self.name,
+            'is_private': self.is_private
+        }
+
+
+class Alert(db.Model):
+    """A watch term found in a stored message"""
+    __tablename__ = 'alerts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.Integer, db.ForeignKey('messages.id'),
+                           nullable=False, index=True)
+    user_id = db.Column(db.String(50), nullable=False)
+    channel_id = db.Column(db.String(50), nullable=False)
+    term = db.Column(db.String(255), nullable=False)
+    category = db.Column(db.String(100), nullable=True)
+    # Number of occurrences of the term in the message
+    occurrences = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    message = db.relationship('Message')
+
+    __table_args__ = (
+        db.Index('ix_alerts_category_created', 'category', 'created_at'),
+        db.Index('ix_alerts_channel_created', 'channel_id', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<Alert {self.term!r} on message {self.message_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'message_id': self.message_id,
+            'user_id': self.user_id,
+            'channel_id': self.channel_id,
+            'term': self.term,
+            'category': self.category,
+            'occurrences': self.occurrences,
+            'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
 
+class UserOrdinal(db.Model):
+    """Dense integer ordinal for a Slack user, used as the bit position in activity bitmaps"""
+    __tablename__ = 'user_ordinals'
+
+    ordinal = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f'<UserOrdinal {self.ordinal} {self.user_id}>'
+
+
+class ActivityBitmap(db.Model):
+    """Serialized bitmap of the user ordinals active in a channel during one hour"""
+    __tablename__ = 'activity_bitmaps'
+
+    id = db.Column(db.Integer, primary_key=True)
+    channel_id = db.Column(db.String(50), nullable=False)
+    # Hours since the Unix epoch (UTC)
+    hour = db.Column(db.Integer, nullable=False)
+    bitmap = db.Column(db.LargeBinary, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('channel_id', 'hour',
+                            name='uq_activity_bitmaps_channel_hour'),
+        db.Index('ix_activity_bitmaps_hour', 'hour'),
+    )
+
+    def __repr__(self):
+        return f'<ActivityBitmap {self.channel_id} hour {self.hour}>'
+
+
+class CompressionDictionary(db.Model):
+    """Trained zstd dictionary used to compress message text and metadata"""
+    __tablename__ = 'compression_dictionaries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    # Id of the dictionary this one superseded (0 for the first); unique, so
+    # workers training at the same time cannot both replace the same one
+    replaces_id = db.Column(db.Integer, nullable=True, unique=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CompressionDictionary {self.id} ({len(self.data)} bytes)>'
+
+
+class TrendState(db.Model):
+    """Checkpoint of one user's or channel's packed vibe and activity trend state"""
+    __tablename__ = 'trend_states'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # "user" or "channel"
+    scope = db.Column(db.String(10), nullable=False)
+    entity_id = db.Column(db.String(50), nullable=False)
+    state = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow,
+                           onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'entity_id',
+                            name='uq_trend_states_scope_entity'),
+    )
+
+    def __repr__(self):
+        return f'<TrendState {self.scope} {self.entity_id}>'
+
+
+class TrendAnomaly(db.Model):
+    """A sharp drop in a user's or channel's vibe or activity rate"""
+    __tablename__ = 'trend_anomalies'
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(10), nullable=False)
+    entity_id = db.Column(db.String(50), nullable=False)
+    # "vibe" or "activity"
+    metric = db.Column(db.String(20), nullable=False)
+    # Short-term value that crossed the threshold and the long-term baseline
+    value = db.Column(db.Float, nullable=False)
+    baseline = db.Column(db.Float, nullable=False)
+    std_dev = db.Column(db.Float, nullable=False)
+    # Message that triggered the drop; NULL when detected from silence
+    message_id = db.Column(db.Integer, db.ForeignKey('messages.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_trend_anomalies_entity_created',
+                 'scope', 'entity_id', 'created_at'),
+        db.Index('ix_trend_anomalies_created', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<TrendAnomaly {self.metric} drop for {self.scope} {self.entity_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'scope': self.scope,
+            'entity_id': self.entity_id,
+            'metric': self.metric,
+            'value': self.value,
+            'baseline': self.baseline,
+            'std_dev': self.std_dev,
+            'message_id': self.message_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+def upgrade_schema():
+    """
+    Add the columns and indexes that models gained after their table was created
+
+    create_all only creates missing tables, so databases created by an older
+    version (e.g. a messages table without thread_ts) are brought up to date
+    here. Columns added to existing tables are always nullable, so a plain
+    ALTER TABLE ... ADD COLUMN is enough on every backend.
+    """
+    inspector = db.inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    tables = set(inspector.get_table_names())
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        with db.engine.begin() as connection:
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(db.text(
+                    f'ALTER TABLE {preparer.format_table(table)} '
+                    f'ADD COLUMN {preparer.format_column(column)} {column_type}'))
+                logger.info(f"Added column {table.name}.{column.name}")
+
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
 def init_app(app):
     """Initialize database with the Flask app"""
-    # Configure SQLAlchemy to use SQLite
-    db_path = os.environ.get('DATABASE_URI', 'sqlite:///vibemeter.db')
+    # Configure SQLAlchemy to use SQLite, unless the app config names a database
+    db_path = app.config.get('SQLALCHEMY_DATABASE_URI') or os.environ.get(
+        'DATABASE_URI', 'sqlite:///vibemeter.db')
     app.config['SQLALCHEMY_DATABASE_URI'] = db_path
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
     # Initialize
     db.init_app(app)
 
-    # Create all tables
+    # Create missing tables and upgrade existing ones
     with app.app_context():
         db.create_all()
+        upgrade_schema()
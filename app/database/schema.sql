@@ -1,5 +1,17 @@
 -- Drop tables if they exist
 DROP TABLE IF EXISTS messages;
+DROP TABLE IF EXISTS threads;
+DROP TABLE IF EXISTS campaign_deliveries;
+DROP TABLE IF EXISTS campaign_runs;
+DROP TABLE IF EXISTS campaigns;
+DROP TABLE IF EXISTS slack_users;
+DROP TABLE IF EXISTS slack_channels;
+DROP TABLE IF EXISTS alerts;
+DROP TABLE IF EXISTS user_ordinals;
+DROP TABLE IF EXISTS activity_bitmaps;
+DROP TABLE IF EXISTS compression_dictionaries;
+DROP TABLE IF EXISTS trend_states;
+DROP TABLE IF EXISTS trend_anomalies;
 
 -- Create messages table
 CREATE TABLE messages (
@@ -8,5 +20,161 @@ CREATE TABLE messages (
     channel_id TEXT NOT NULL, 
     message_text TEXT NOT NULL,
     timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    message_metadata JSON
-);
\ No newline at end of file
+    message_metadata JSON,
+    compressed_text BLOB,
+    compressed_metadata BLOB,
+    direction TEXT,
+    compression_dict_id INTEGER,
+    event_id TEXT,
+    thread_ts TEXT,
+    parent_user_id TEXT,
+    cluster_id INTEGER
+);
+
+CREATE INDEX ix_messages_channel_thread ON messages (channel_id, thread_ts, timestamp);
+CREATE INDEX ix_messages_parent_user_id ON messages (parent_user_id);
+CREATE INDEX ix_messages_cluster_id ON messages (cluster_id);
+CREATE INDEX ix_messages_direction ON messages (direction);
+CREATE INDEX ix_messages_compression_dict_id ON messages (compression_dict_id);
+CREATE UNIQUE INDEX ix_messages_event_id ON messages (event_id);
+
+-- Create threads table (reply counts are maintained on ingest)
+CREATE TABLE threads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel_id TEXT NOT NULL,
+    thread_ts TEXT NOT NULL,
+    parent_user_id TEXT,
+    reply_count INTEGER NOT NULL DEFAULT 0,
+    last_reply_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_threads_channel_thread UNIQUE (channel_id, thread_ts)
+);
+
+CREATE INDEX ix_threads_channel_last_reply ON threads (channel_id, last_reply_at);
+
+-- Create campaign tables (scheduled pulse surveys)
+CREATE TABLE campaigns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    message_template TEXT NOT NULL,
+    audience JSON NOT NULL,
+    schedule TEXT,
+    active BOOLEAN NOT NULL DEFAULT 1,
+    next_run_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX ix_campaigns_next_run_at ON campaigns (next_run_at);
+
+CREATE TABLE campaign_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    campaign_id INTEGER NOT NULL REFERENCES campaigns (id),
+    status TEXT NOT NULL DEFAULT 'running',
+    audience_cursor TEXT,
+    audience_exhausted BOOLEAN NOT NULL DEFAULT 0,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX ix_campaign_runs_campaign_id ON campaign_runs (campaign_id);
+CREATE INDEX ix_campaign_runs_status ON campaign_runs (status);
+
+CREATE TABLE campaign_deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES campaign_runs (id),
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP,
+    claimed_at TIMESTAMP,
+    sent_at TIMESTAMP,
+    error TEXT,
+    CONSTRAINT uq_campaign_deliveries_run_user UNIQUE (run_id, user_id)
+);
+
+CREATE INDEX ix_campaign_deliveries_run_status ON campaign_deliveries (run_id, status, next_attempt_at);
+
+-- Create directory tables (cached Slack user and channel metadata)
+CREATE TABLE slack_users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT,
+    real_name TEXT,
+    display_name TEXT,
+    tz TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE slack_channels (
+    channel_id TEXT PRIMARY KEY,
+    name TEXT,
+    is_private BOOLEAN NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create alerts table (watch terms found in messages)
+CREATE TABLE alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id INTEGER NOT NULL REFERENCES messages (id),
+    user_id TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    term TEXT NOT NULL,
+    category TEXT,
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX ix_alerts_message_id ON alerts (message_id);
+CREATE INDEX ix_alerts_category_created ON alerts (category, created_at);
+CREATE INDEX ix_alerts_channel_created ON alerts (channel_id, created_at);
+
+-- Create activity index tables (hourly bitmaps of active users per channel)
+CREATE TABLE user_ordinals (
+    ordinal INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE activity_bitmaps (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel_id TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    bitmap BLOB NOT NULL,
+    CONSTRAINT uq_activity_bitmaps_channel_hour UNIQUE (channel_id, hour)
+);
+
+CREATE INDEX ix_activity_bitmaps_hour ON activity_bitmaps (hour);
+
+-- Create compression dictionaries table (compressed_text and
+-- compressed_metadata hold zstd blobs prefixed with one of these ids)
+CREATE TABLE compression_dictionaries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data BLOB NOT NULL,
+    sample_count INTEGER NOT NULL DEFAULT 0,
+    replaces_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX ix_compression_dictionaries_replaces_id ON compression_dictionaries (replaces_id);
+
+-- Create vibe trend tables (checkpointed tracker state and detected drops)
+CREATE TABLE trend_states (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    state BLOB NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_trend_states_scope_entity UNIQUE (scope, entity_id)
+);
+
+CREATE TABLE trend_anomalies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    baseline REAL NOT NULL,
+    std_dev REAL NOT NULL,
+    message_id INTEGER REFERENCES messages (id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX ix_trend_anomalies_entity_created ON trend_anomalies (scope, entity_id, created_at);
+CREATE INDEX ix_trend_anomalies_created ON trend_anomalies (created_at);
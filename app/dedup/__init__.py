@@ -0,0 +1,2 @@
+from app.dedup.detector import duplicate_detector, tag_duplicate, init_dedup
+from app.dedup.minhash import MinHasher, LSHIndex
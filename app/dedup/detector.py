@@ -0,0 +1,177 @@
+"""
+Near-duplicate and flood detection for incoming messages
+
+Each stored message is MinHashed and looked up in a sliding-window LSH index.
+Near-duplicates are tagged with the id of the first message of their cluster
+(Message.cluster_id), and per-channel counters track how much of the recent
+traffic is repeated content.
+"""
+import logging
+import threading
+import time
+from collections import deque, Counter
+from app.dedup.minhash import MinHasher, LSHIndex, normalize
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Upper bound on messages remembered per channel for flood metrics
+MAX_RECENT_PER_CHANNEL = 100000
+
+
+class DuplicateDetector:
+    """
+    Tags near-duplicate messages and keeps per-channel flood statistics
+
+    Args:
+        threshold (float): Estimated Jaccard similarity for two messages to match
+        window (float): Seconds of history used for matching and flood rates
+        max_entries (int): Cap on clusters held in the LSH index
+        min_length (int): Shorter normalized texts ("ok", "thanks!") are never clustered
+    """
+
+    def __init__(self, threshold=0.8, window=3600, max_entries=50000, min_length=20):
+        self.hasher = MinHasher(num_perm=32)
+        self._lock = threading.Lock()
+        self.configure(threshold, window, max_entries, min_length)
+
+    def configure(self, threshold, window, max_entries, min_length):
+        """Apply new settings, starting from an empty index"""
+        with self._lock:
+            self.threshold = threshold
+            self.window = window
+            self.min_length = min_length
+            self.index = LSHIndex(bands=8, rows=4, window=window,
+                                  max_entries=max_entries)
+            # channel_id -> deque of (seen_at, cluster_id or None)
+            self._recent = {}
+
+    def observe(self, message_id, channel_id, text, seen_at=None):
+        """
+        Look a message up in the index and record it for flood metrics
+
+        Args:
+            message_id (int): The stored message id, used as the cluster id of new clusters
+            channel_id (str): The channel the message was posted in
+            text (str): The message text
+            seen_at (float, optional): Message time in seconds; defaults to now
+
+        Returns:
+            int: The id of the cluster's first message, or None if the message is not a duplicate
+        """
+        seen_at = seen_at or time.time()
+        normalized = normalize(text)
+
+        cluster_id = None
+        if len(normalized) >= self.min_length:
+            signature = self.hasher.signature(normalized)
+            cluster_id = self.index.query_and_add(
+                signature, message_id, seen_at, self.threshold)
+
+        with self._lock:
+            recent = self._recent.get(channel_id)
+            if recent is None:
+                recent = self._recent[channel_id] = deque(
+                    maxlen=MAX_RECENT_PER_CHANNEL)
+            recent.append((seen_at, cluster_id))
+            self._trim(recent, seen_at)
+
+        return cluster_id
+
+    def _trim(self, recent, now):
+        cutoff = now - self.window
+        while recent and recent[0][0] < cutoff:
+            recent.popleft()
+
+    def flood_metrics(self, channel_id=None, now=None):
+        """
+        Summarize recent traffic per channel
+
+        Args:
+            channel_id (str, optional): Only report this channel
+            now (float, optional): Reference time; defaults to now
+
+        Returns:
+            dict: channel_id -> message and duplicate counts and rates over the window
+        """
+        now = now or time.time()
+        minutes = self.window / 60
+        metrics = {}
+
+        with self._lock:
+            channels = [channel_id] if channel_id else list(self._recent)
+
+            for channel in channels:
+                recent = self._recent.get(channel)
+                if recent is None:
+                    continue
+
+                self._trim(recent, now)
+                if not recent:
+                    # Idle channels are dropped so the map stays bounded
+                    del self._recent[channel]
+                    continue
+
+                clusters = Counter(cluster_id for _, cluster_id in recent
+                                   if cluster_id is not None)
+                duplicates = sum(clusters.values())
+
+                metrics[channel] = {
+                    "window_seconds": self.window,
+                    "messages": len(recent),
+                    "duplicates": duplicates,
+                    "duplicate_ratio": round(duplicates / len(recent), 3),
+                    "messages_per_minute": round(len(recent) / minutes, 3),
+                    "duplicates_per_minute": round(duplicates / minutes, 3),
+                    "top_clusters": [
+                        {"cluster_id": cluster_id, "duplicates": count}
+                        for cluster_id, count in clusters.most_common(5)
+                    ]
+                }
+
+        return metrics
+
+
+# Process-wide detector - configured in init_dedup
+duplicate_detector = DuplicateDetector()
+
+
+def tag_duplicate(message):
+    """
+    Set message.cluster_id when the message is a near-duplicate of a recent one.
+    The message must already be committed, so the detector only ever
+    remembers stored messages; the caller commits the cluster_id.
+
+    Args:
+        message (Message): The message being stored
+
+    Returns:
+        int: The cluster id, or None
+    """
+    slack_ts = (message.message_metadata or {}).get("slack_ts")
+    try:
+        seen_at = float(slack_ts) if slack_ts else None
+    except ValueError:
+        seen_at = None
+
+    cluster_id = duplicate_detector.observe(
+        message.id, message.channel_id, message.message_text, seen_at)
+    message.cluster_id = cluster_id
+    return cluster_id
+
+
+def init_dedup(app):
+    """
+    Configure the duplicate detector from the app config
+
+    Config keys: DEDUP_THRESHOLD (default 0.8), DEDUP_WINDOW in seconds
+    (default 3600), DEDUP_MAX_ENTRIES (default 50000) and DEDUP_MIN_LENGTH
+    (default 20).
+    """
+    duplicate_detector.configure(
+        threshold=app.config.get('DEDUP_THRESHOLD', 0.8),
+        window=app.config.get('DEDUP_WINDOW', 3600),
+        max_entries=app.config.get('DEDUP_MAX_ENTRIES', 50000),
+        min_length=app.config.get('DEDUP_MIN_LENGTH', 20)
+    )
+    return app
@@ -0,0 +1,179 @@
+"""
+MinHash signatures and a sliding-window LSH index for near-duplicate lookup
+"""
+import random
+import re
+import threading
+import zlib
+from array import array
+from collections import OrderedDict, namedtuple
+
+_MASK64 = (1 << 64) - 1
+
+# Above any 32-bit bin minimum
+_EMPTY = 1 << 32
+
+# Mentions, links and digits vary between otherwise identical broadcasts
+_NOISE = re.compile(r"<[^>]*>|\d+")
+_SPACES = re.compile(r"\s+")
+
+Entry = namedtuple("Entry", ["signature", "cluster_id", "seen_at", "band_keys"])
+
+
+def normalize(text):
+    """Lowercase, drop mentions/links/digits and collapse whitespace"""
+    return _SPACES.sub(" ", _NOISE.sub(" ", text.lower())).strip()
+
+
+class MinHasher:
+    """
+    One-permutation MinHash over byte shingles
+
+    Each shingle is hashed once with a multiply-shift hash. The hash picks one
+    of num_perm bins and each bin keeps its minimum, so the cost is a single
+    hash per shingle instead of one per permutation. Bins no shingle fell
+    into are filled from the first non-empty bin in a fixed pseudo-random
+    probe order (optimal densification), which keeps the slots of similar
+    texts comparable.
+
+    Args:
+        num_perm (int): Signature length
+        shingle_size (int): Bytes per shingle
+        max_chars (int): Only this many leading characters are hashed, which
+            bounds the cost of very long messages
+        seed (int): Seed for the hash coefficients and probe orders
+    """
+
+    def __init__(self, num_perm=32, shingle_size=5, max_chars=1000, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_chars = max_chars
+        self._a = rng.getrandbits(64) | 1
+        self._b = rng.getrandbits(64)
+        self._probes = [rng.sample(range(num_perm), num_perm) for _ in range(num_perm)]
+
+    def signature(self, text):
+        """
+        Compute the MinHash signature of already normalized text
+
+        Returns:
+            array: num_perm unsigned 32-bit minimums
+        """
+        data = text[:self.max_chars].encode()
+        k, n, a, b = self.shingle_size, self.num_perm, self._a, self._b
+        crc32 = zlib.crc32
+
+        bins = [_EMPTY] * n
+        for x in {crc32(data[i:i + k]) for i in range(max(len(data) - k + 1, 1))}:
+            value, slot = divmod(((a * x + b) & _MASK64) >> 32, n)
+            if value < bins[slot]:
+                bins[slot] = value
+
+        signature = array("I", bytes(4 * n))
+        for i, value in enumerate(bins):
+            if value == _EMPTY:
+                # Copy from the original bins only, never from another copy
+                value = next((bins[j] for j in self._probes[i] if bins[j] != _EMPTY), 0)
+            signature[i] = value
+        return signature
+
+
+def similarity(sig_a, sig_b):
+    """Estimate Jaccard similarity as the fraction of equal signature slots"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class LSHIndex:
+    """
+    Banded LSH index over the signatures seen in a sliding time window
+
+    Only the first message of each cluster is indexed, and it is kept alive
+    while the cluster stays active, so a flood of copies does not grow the
+    buckets. Entries idle for longer than the window, or beyond max_entries,
+    are evicted oldest first, so memory stays bounded no matter the message
+    rate. A query probes one bucket per band and verifies candidates against
+    the full signature.
+
+    Args:
+        bands (int): Number of bands; bands * rows must equal the signature length
+        rows (int): Signature slots per band
+        window (float): Seconds an entry stays queryable
+        max_entries (int): Hard cap on indexed entries
+    """
+
+    def __init__(self, bands=8, rows=4, window=3600, max_entries=50000):
+        self.bands = bands
+        self.rows = rows
+        self.window = window
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_keys(self, signature):
+        r = self.rows
+        return [(band, hash(tuple(signature[band * r:(band + 1) * r])))
+                for band in range(self.bands)]
+
+    def _evict(self, now):
+        entries = self._entries
+        while entries:
+            key, entry = next(iter(entries.items()))
+            if len(entries) <= self.max_entries and entry.seen_at >= now - self.window:
+                break
+
+            entries.popitem(last=False)
+            for band_key in entry.band_keys:
+                bucket = self._buckets.get(band_key)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band_key]
+
+    def query_and_add(self, signature, cluster_id, now, threshold=0.8):
+        """
+        Find the most similar indexed cluster, indexing the signature if there is none
+
+        Args:
+            signature (array): The MinHash signature
+            cluster_id (int): Cluster to index the signature under if it has no match
+            now (float): Message time in seconds
+            threshold (float): Minimum estimated Jaccard similarity for a match
+
+        Returns:
+            int: The matched cluster id, or None if nothing is similar enough
+        """
+        band_keys = self._band_keys(signature)
+
+        with self._lock:
+            self._evict(now)
+
+            candidates = set()
+            for band_key in band_keys:
+                candidates.update(self._buckets.get(band_key, ()))
+
+            best_key, best_score = None, threshold
+            for key in candidates:
+                score = similarity(signature, self._entries[key].signature)
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+            if best_key is not None:
+                # Refresh the cluster so an ongoing flood is not evicted
+                entry = self._entries.pop(best_key)._replace(seen_at=now)
+                self._entries[best_key] = entry
+                return entry.cluster_id
+
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = Entry(signature, cluster_id, now, band_keys)
+            for band_key in band_keys:
+                self._buckets.setdefault(band_key, set()).add(key)
+
+            self._evict(now)
+            return None
@@ -0,0 +1,199 @@
+"""
+Application logging: structured JSON records written off the request thread
+
+configure_logging installs a single QueueHandler on the root logger. Callers
+only pay for filtering and enqueueing a record; formatting, redaction and I/O
+happen on a QueueListener thread. Records tagged with an event type (see
+log_event) can be sampled and rate limited per type, and configured fields such
+as message_text are redacted before they are written.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Record attributes that are part of every LogRecord, not caller fields
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+def log_event(logger, event, msg, level=logging.INFO, **fields):
+    """
+    Log a structured record tagged with an event type
+
+    Args:
+        logger (logging.Logger): The module logger
+        event (str): The event type used for sampling and rate limits, e.g. "message.stored"
+        msg (str): A human readable summary
+        level (int): The log level
+        **fields: Structured fields added to the JSON record
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, extra={"event": event, "fields": fields})
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, redacting sensitive fields"""
+
+    def __init__(self, redact_fields=()):
+        super().__init__()
+        self.redact_fields = set(redact_fields)
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        if getattr(record, "event", None):
+            entry["event"] = record.event
+
+        fields = dict(getattr(record, "fields", None) or {})
+        # Plain extra={...} keys are included as fields too
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and key not in ("event", "fields"):
+                fields.setdefault(key, value)
+
+        for key in self.redact_fields & fields.keys():
+            value = fields[key]
+            fields[key] = f"[redacted {len(value)} chars]" \
+                if isinstance(value, str) else "[redacted]"
+        entry.update(fields)
+
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Per-event-type sampling and rate limiting
+
+    Only records tagged with an event are affected, and WARNING and above are
+    always kept. Sampling keeps a random fraction of records; rate limits cap
+    records per second with a token bucket allowing one second of burst.
+    """
+
+    def __init__(self, sampling=None, rate_limits=None):
+        super().__init__()
+        self.sampling = dict(sampling or {})
+        self.rate_limits = dict(rate_limits or {})
+        self.dropped = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+
+        rate = self.sampling.get(event)
+        if rate is not None and random.random() >= rate:
+            return self._drop(event)
+
+        limit = self.rate_limits.get(event)
+        if limit is not None and not self._take_token(event, limit):
+            return self._drop(event)
+
+        return True
+
+    def _take_token(self, event, limit):
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(event, (limit, now))
+            tokens = min(limit, tokens + (now - last) * limit)
+
+            if tokens < 1:
+                self._buckets[event] = (tokens, now)
+                return False
+
+            self._buckets[event] = (tokens - 1, now)
+            return True
+
+    def _drop(self, event):
+        with self._lock:
+            self.dropped[event] = self.dropped.get(event, 0) + 1
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.overflowed = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.overflowed += 1
+
+
+def configure_logging(app):
+    """
+    Configure process-wide logging from the app config. Safe to call again;
+    later calls only update the level and filters.
+
+    Config keys:
+    - LOG_LEVEL: Root log level (default INFO)
+    - LOG_FORMAT: "json" (default) or "text"
+    - LOG_SAMPLING: Event type -> fraction of records kept, e.g. {"message.stored": 0.1}
+    - LOG_RATE_LIMITS: Event type -> max records per second
+    - LOG_REDACT_FIELDS: Structured fields to redact (default message_text and text)
+    - LOG_QUEUE_SIZE: Records buffered before new ones are dropped (default 10000)
+    """
+    global _listener, _queue_handler
+
+    config = app.config
+    root = logging.getLogger()
+    root.setLevel(config.get('LOG_LEVEL', 'INFO'))
+
+    sampling_filter = SamplingFilter(
+        sampling=config.get('LOG_SAMPLING'),
+        rate_limits=config.get('LOG_RATE_LIMITS', {
+            "message.stored": 100,
+            "message.sent": 100,
+        })
+    )
+
+    with _lock:
+        if _queue_handler is not None:
+            for old in list(_queue_handler.filters):
+                _queue_handler.removeFilter(old)
+            _queue_handler.addFilter(sampling_filter)
+            return
+
+        if config.get('LOG_FORMAT', 'json') == 'json':
+            formatter = JsonFormatter(config.get(
+                'LOG_REDACT_FIELDS', ('message_text', 'text')))
+        else:
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(formatter)
+
+        log_queue = queue.Queue(maxsize=config.get('LOG_QUEUE_SIZE', 10000))
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        _queue_handler.addFilter(sampling_filter)
+
+        _listener = QueueListener(
+            log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        # Flush whatever is still queued on interpreter exit
+        atexit.register(_listener.stop)
+
+        root.addHandler(_queue_handler)
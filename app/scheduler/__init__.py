@@ -0,0 +1,2 @@
+from app.scheduler.engine import init_scheduler, CampaignScheduler
+from app.scheduler.cron import CronSchedule
@@ -0,0 +1,65 @@
+"""
+Lazy, chunked expansion of campaign audiences into Slack user IDs
+"""
+from app.slack.client import slack_client
+
+AUDIENCE_TYPES = ("users", "channel", "workspace")
+
+
+def validate_audience(audience):
+    """
+    Check that an audience spec is well formed
+
+    Raises:
+        ValueError: If the spec cannot be expanded
+    """
+    if not isinstance(audience, dict) or audience.get("type") not in AUDIENCE_TYPES:
+        raise ValueError(
+            f"audience.type must be one of: {', '.join(AUDIENCE_TYPES)}")
+
+    if audience["type"] == "users" and not isinstance(audience.get("user_ids"), list):
+        raise ValueError("audience.user_ids must be a list")
+
+    if audience["type"] == "channel" and not audience.get("channel_id"):
+        raise ValueError("audience.channel_id is required")
+
+
+def expand_audience(audience, cursor=None, limit=500):
+    """
+    Fetch the next chunk of recipients for an audience
+
+    Args:
+        audience (dict): The audience spec stored on the campaign
+        cursor (str, optional): The checkpoint returned by the previous call
+        limit (int): Maximum number of recipients to return
+
+    Returns:
+        tuple: (list of user IDs, next cursor or None when exhausted)
+    """
+    kind = audience["type"]
+
+    if kind == "users":
+        offset = int(cursor or 0)
+        user_ids = audience["user_ids"][offset:offset + limit]
+        next_offset = offset + len(user_ids)
+        more = next_offset < len(audience["user_ids"])
+        return user_ids, str(next_offset) if more else None
+
+    page_args = {"limit": limit}
+    if cursor:
+        page_args["cursor"] = cursor
+
+    if kind == "channel":
+        response = slack_client.conversations_members(
+            channel=audience["channel_id"], **page_args)
+        user_ids = response["members"]
+    else:
+        response = slack_client.users_list(**page_args)
+        user_ids = [
+            member["id"] for member in response["members"]
+            if not member.get("deleted") and not member.get("is_bot")
+            and member["id"] != "USLACKBOT"
+        ]
+
+    next_cursor = (response.get("response_metadata") or {}).get("next_cursor")
+    return user_ids, next_cursor or None
@@ -0,0 +1,130 @@
+"""
+Minimal cron-like schedule parsing for campaigns
+"""
+from datetime import timedelta
+
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 9 * * *",
+    "@weekly": "0 9 * * 1",
+    "@monthly": "0 9 1 * *",
+}
+
+# (name, minimum, maximum) for each of the five cron fields
+FIELDS = [
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    # 0 and 7 both mean Sunday
+    ("weekday", 0, 7),
+]
+
+
+def _parse_field(spec, name, low, high):
+    """Expand one cron field (``*``, lists, ranges and ``/step``) into a set"""
+    values = set()
+
+    for part in spec.split(","):
+        step = 1
+        if "/" in part:
+            part, step_spec = part.split("/", 1)
+            if not step_spec.isdigit() or int(step_spec) == 0:
+                raise ValueError(f"Invalid step in {name} field: {spec}")
+            step = int(step_spec)
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_spec, end_spec = part.split("-", 1)
+            if not (start_spec.isdigit() and end_spec.isdigit()):
+                raise ValueError(f"Invalid range in {name} field: {spec}")
+            start, end = int(start_spec), int(end_spec)
+        elif part.isdigit():
+            start = int(part)
+            end = high if step > 1 else start
+        else:
+            raise ValueError(f"Invalid {name} field: {spec}")
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"{name} field out of range: {spec}")
+
+        values.update(range(start, end + 1, step))
+
+    if name == "weekday" and 7 in values:
+        values.discard(7)
+        values.add(0)
+
+    return values
+
+
+class CronSchedule:
+    """
+    A five-field cron expression (minute hour day month weekday), evaluated in UTC
+
+    Weekdays run from 0 (Sunday) to 6 (Saturday). As in cron, when both the day
+    and weekday fields are restricted a time matches if either one does.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        spec = ALIASES.get(self.expression, self.expression)
+        parts = spec.split()
+
+        if len(parts) != 5:
+            raise ValueError(
+                f"Schedule must have five fields, got: {expression!r}")
+
+        (self.minutes, self.hours, self.days, self.months,
+         self.weekdays) = [
+            _parse_field(part, *field) for part, field in zip(parts, FIELDS)
+        ]
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    def _day_matches(self, dt):
+        # Python's Monday is 0; cron's Sunday is 0
+        weekday = (dt.weekday() + 1) % 7
+        day_ok = dt.day in self.days
+        weekday_ok = weekday in self.weekdays
+
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after):
+        """
+        Return the first matching minute strictly after the given datetime
+
+        Args:
+            after (datetime): The reference time (naive UTC)
+
+        Returns:
+            datetime: The next fire time
+        """
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # A valid expression matches at least once every few years
+        limit = dt + timedelta(days=366 * 5)
+
+        while dt < limit:
+            if dt.month not in self.months:
+                # Jump to the start of the next month
+                dt = (dt.replace(day=1, hour=0, minute=0) +
+                      timedelta(days=32)).replace(day=1)
+                continue
+
+            if not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+
+            if dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+                continue
+
+            if dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+                continue
+
+            return dt
+
+        raise ValueError(f"Schedule never fires: {self.expression!r}")
@@ -0,0 +1,330 @@
+"""
+Campaign scheduler: fires due campaigns and fans their messages out to recipients
+
+Every campaign firing creates a CampaignRun. Audiences are expanded lazily, one
+chunk at a time, and each chunk is written as CampaignDelivery rows together
+with the audience cursor, so a restart resumes from the last checkpoint instead
+of re-sending or re-expanding. Deliveries are dispatched through send_message on
+a small worker pool, paced by a shared rate limiter to stay within Slack limits.
+"""
+import logging
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from app.database.db import db, Campaign, CampaignRun, CampaignDelivery
+from app.scheduler.audience import expand_audience
+from app.scheduler.cron import CronSchedule
+from app.slack.client import send_message
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe pacer that hands out evenly spaced send slots"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the caller's slot comes up"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class CampaignScheduler:
+    """
+    Background scheduler that fires due campaigns and drives their runs
+
+    Configuration (Flask config keys):
+    - SCHEDULER_SEND_RATE: Messages per second across all workers (default 0.8,
+      which keeps DM fan-out under the Tier 3 limit of conversations.open)
+    - SCHEDULER_WORKERS: Size of the dispatch worker pool (default 4)
+    - SCHEDULER_CHUNK_SIZE: Recipients expanded per audience chunk (default 500)
+    - SCHEDULER_POLL_INTERVAL: Seconds between scheduler ticks (default 30)
+    - SCHEDULER_MAX_ATTEMPTS: Send attempts per recipient (default 3)
+    - SCHEDULER_CLAIM_TIMEOUT: Seconds before an unfinished send is retried (default 300)
+
+    Each tick advances every running run by one slice of about a poll
+    interval's worth of sends, so a long fan-out never delays other campaigns'
+    firings or the requeueing of stale claims.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        config = app.config
+        self.chunk_size = config.get('SCHEDULER_CHUNK_SIZE', 500)
+        self.poll_interval = config.get('SCHEDULER_POLL_INTERVAL', 30)
+        self.max_attempts = config.get('SCHEDULER_MAX_ATTEMPTS', 3)
+        self.claim_timeout = config.get('SCHEDULER_CLAIM_TIMEOUT', 300)
+        send_rate = config.get('SCHEDULER_SEND_RATE', 0.8)
+        self.limiter = RateLimiter(send_rate)
+        self.slice_size = max(1, min(self.chunk_size, int(send_rate * self.poll_interval)))
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.get('SCHEDULER_WORKERS', 4),
+            thread_name_prefix='campaign-worker'
+        )
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the scheduler loop in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name='campaign-scheduler', daemon=True)
+        self._thread.start()
+        logger.info("Campaign scheduler started")
+
+    def stop(self):
+        """Stop the loop; unsent deliveries stay pending for the next start"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.executor.shutdown(wait=True)
+        logger.info("Campaign scheduler stopped")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                busy = self.tick()
+            except Exception as e:
+                logger.error(f"Campaign scheduler tick failed: {e}")
+                busy = False
+            # Runs with work left continue on the next tick right away
+            if not busy:
+                self._stop.wait(self.poll_interval)
+
+    def tick(self):
+        """
+        Fire due campaigns, then advance every unfinished run by one slice
+
+        Returns:
+            bool: True if some run has more work ready right away
+        """
+        with self.app.app_context():
+            self._fire_due_campaigns()
+            self._requeue_stale_claims()
+
+            run_ids = [run_id for (run_id,) in db.session.query(CampaignRun.id)
+                       .filter(CampaignRun.status == 'running').all()]
+
+        busy = False
+        for run_id in run_ids:
+            if self._stop.is_set():
+                break
+            busy = self.process_run(run_id) or busy
+        return busy
+
+    def _fire_due_campaigns(self):
+        now = datetime.utcnow()
+        due = Campaign.query.filter(
+            Campaign.active.is_(True),
+            Campaign.next_run_at <= now
+        ).all()
+
+        for campaign in due:
+            # Skip this firing if the previous one is still going
+            busy = campaign.runs.filter(
+                CampaignRun.status == 'running').first()
+
+            if busy and not campaign.schedule:
+                # A one-shot campaign has no later firing; keep it due instead
+                continue
+
+            if campaign.schedule:
+                next_run_at = CronSchedule(campaign.schedule).next_after(now)
+            else:
+                next_run_at = None
+
+            # Compare-and-set on next_run_at so only one scheduler fires it
+            fired = Campaign.query.filter(
+                Campaign.id == campaign.id,
+                Campaign.next_run_at == campaign.next_run_at
+            ).update({
+                Campaign.next_run_at: next_run_at,
+                Campaign.active: next_run_at is not None
+            }, synchronize_session=False)
+
+            if fired and not busy:
+                db.session.add(CampaignRun(campaign_id=campaign.id))
+                logger.info(f"Campaign {campaign.id} fired")
+
+            db.session.commit()
+
+    def _requeue_stale_claims(self):
+        # A claim this old means the worker died mid-send; retry it
+        cutoff = datetime.utcnow() - timedelta(seconds=self.claim_timeout)
+        CampaignDelivery.query.filter(
+            CampaignDelivery.status == 'sending',
+            CampaignDelivery.claimed_at < cutoff
+        ).update({CampaignDelivery.status: 'pending'}, synchronize_session=False)
+        db.session.commit()
+
+    def process_run(self, run_id):
+        """
+        Advance a run by one slice: send up to slice_size ready deliveries,
+        expand the next audience chunk, or mark the run completed
+
+        Args:
+            run_id (int): The CampaignRun to advance
+
+        Returns:
+            bool: True if the run has more work ready right away, False if it
+            completed or only has deliveries waiting on backoff
+        """
+        with self.app.app_context():
+            ready = [delivery_id for (delivery_id,) in
+                     db.session.query(CampaignDelivery.id).filter(
+                         CampaignDelivery.run_id == run_id,
+                         CampaignDelivery.status == 'pending',
+                         db.or_(CampaignDelivery.next_attempt_at.is_(None),
+                                CampaignDelivery.next_attempt_at <= datetime.utcnow())
+            ).order_by(CampaignDelivery.id).limit(self.slice_size).all()]
+
+            if ready:
+                futures = {self.executor.submit(self._deliver, delivery_id): delivery_id
+                           for delivery_id in ready}
+                wait(futures)
+                self._check_results(futures)
+                return True
+
+            run = db.session.get(CampaignRun, run_id)
+
+            if not run.audience_exhausted:
+                self._expand_chunk(run)
+                return True
+
+            outstanding = CampaignDelivery.query.filter(
+                CampaignDelivery.run_id == run_id,
+                CampaignDelivery.status.in_(('pending', 'sending'))
+            ).count()
+
+            if not outstanding:
+                run.status = 'completed'
+                run.finished_at = datetime.utcnow()
+                db.session.commit()
+                logger.info(f"Campaign run {run_id} completed")
+            return False
+
+    def _check_results(self, futures):
+        """Record deliveries whose worker raised, instead of leaving them claimed"""
+        for future, delivery_id in futures.items():
+            error = future.exception()
+            if error is None:
+                continue
+
+            logger.error(f"Campaign delivery {delivery_id} failed: {error}")
+            try:
+                db.session.rollback()
+                self._record_failure(delivery_id, str(error))
+            except Exception as e:
+                # Left 'sending'; the claim timeout will requeue it
+                db.session.rollback()
+                logger.error(f"Cannot record failure of delivery {delivery_id}: {e}")
+
+    def _expand_chunk(self, run):
+        user_ids, next_cursor = expand_audience(
+            run.campaign.audience, run.audience_cursor, self.chunk_size)
+
+        # Skip recipients already materialised, e.g. duplicates in the audience
+        existing = {user_id for (user_id,) in
+                    db.session.query(CampaignDelivery.user_id).filter(
+                        CampaignDelivery.run_id == run.id,
+                        CampaignDelivery.user_id.in_(user_ids)).all()}
+
+        for user_id in dict.fromkeys(user_ids):
+            if user_id not in existing:
+                db.session.add(CampaignDelivery(run_id=run.id, user_id=user_id))
+
+        # The new rows and the cursor are checkpointed together
+        run.audience_cursor = next_cursor
+        run.audience_exhausted = next_cursor is None
+        db.session.commit()
+
+    def _deliver(self, delivery_id):
+        if self._stop.is_set():
+            return
+
+        self.limiter.acquire()
+
+        with self.app.app_context():
+            # Atomic claim so a recipient is never sent to by two workers
+            claimed = CampaignDelivery.query.filter(
+                CampaignDelivery.id == delivery_id,
+                CampaignDelivery.status == 'pending'
+            ).update({
+                CampaignDelivery.status: 'sending',
+                CampaignDelivery.claimed_at: datetime.utcnow()
+            }, synchronize_session=False)
+            db.session.commit()
+
+            if not claimed:
+                return
+
+            delivery = db.session.get(CampaignDelivery, delivery_id)
+            campaign = db.session.get(CampaignRun, delivery.run_id).campaign
+            text = string.Template(campaign.message_template).safe_substitute(
+                user_id=delivery.user_id, campaign=campaign.name)
+
+            # Staged here so it commits together with the stored message
+            delivery.status = 'sent'
+            delivery.sent_at = datetime.utcnow()
+            delivery.attempts += 1
+
+            error = None
+            try:
+                result = send_message(user_id=delivery.user_id, text=text)
+            except Exception as e:
+                result = None
+                error = str(e)
+
+            if result:
+                return
+
+            db.session.rollback()
+            self._record_failure(delivery_id, error or "send_message failed")
+
+    def _record_failure(self, delivery_id, error):
+        delivery = db.session.get(CampaignDelivery, delivery_id)
+        delivery.attempts += 1
+        delivery.error = error
+
+        if delivery.attempts >= self.max_attempts:
+            delivery.status = 'failed'
+            logger.error(
+                f"Giving up on {delivery.user_id} in run {delivery.run_id}: {error}")
+        else:
+            delivery.status = 'pending'
+            delivery.next_attempt_at = datetime.utcnow() + timedelta(
+                seconds=30 * 2 ** (delivery.attempts - 1))
+
+        db.session.commit()
+
+
+def init_scheduler(app):
+    """
+    Initialize the campaign scheduler with the Flask app
+
+    The background loop only runs when SCHEDULER_ENABLED is set, so that test
+    apps and one-off scripts do not start sending campaigns.
+    """
+    scheduler = CampaignScheduler(app)
+    app.extensions['campaign_scheduler'] = scheduler
+
+    if app.config.get('SCHEDULER_ENABLED'):
+        scheduler.start()
+
+    return app
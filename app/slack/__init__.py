@@ -1 +1,2 @@
 from app.slack.client import slack_client, send_message
+from app.slack.directory import directory_cache, warm_directory, lookup_users, lookup_channels
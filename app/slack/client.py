@@ -5,18 +5,19 @@ import os
 import logging
 from slack import WebClient
 from slack.errors import SlackApiError
-from app.database.db import db, Message
+from app.database.db import db, Message, Thread
+from app.logs import log_event
+from app.stream import publish_message
 from datetime import datetime
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize the Slack client with the bot token
 slack_client = WebClient(token=os.environ.get("SLACK_BOT_TOKEN"))
 
 
-def send_message(user_id, text, channel_id=None):
+def send_message(user_id, text, channel_id=None, thread_ts=None):
     """
     Send a message to a user or channel via Slack
 
@@ -24,6 +25,7 @@ def send_message(user_id, text, channel_id=None):
         user_id (str): The Slack user ID
         text (str): The message text
         channel_id (str, optional): The channel ID. If not provided, sends DM to user_id
+        thread_ts (str, optional): The ts of a thread root to reply in
 
     Returns:
         dict: The response from the Slack API
@@ -35,11 +37,12 @@ def send_message(user_id, text, channel_id=None):
             response = slack_client.conversations_open(users=user_id)
             channel_id = response['channel']['id']
 
-        # Send the message
-        result = slack_client.chat_postMessage(
-            channel=channel_id,
-            text=text
-        )
+        # Send the message, as a thread reply when thread_ts is given
+        post_args = {"channel": channel_id, "text": text}
+        if thread_ts:
+            post_args["thread_ts"] = thread_ts
+
+        result = slack_client.chat_postMessage(**post_args)
 
         # Store the sent message in the database
         message = Message(
@@ -49,13 +52,22 @@ def send_message(user_id, text, channel_id=None):
             message_metadata={
                 "slack_ts": result.get("ts"),
                 "direction": "outgoing"  # Mark as an outgoing message
-            }
+            },
+            direction="outgoing",
+            thread_ts=thread_ts or result.get("ts")
         )
 
         db.session.add(message)
+
+        if thread_ts:
+            Thread.record_reply(channel_id, thread_ts)
+
         db.session.commit()
 
-        logger.info(f"Message sent to {channel_id}")
+        publish_message(message)
+
+        log_event(logger, "message.sent", f"Message sent to {channel_id}",
+                  user_id=user_id, channel_id=channel_id, message_text=text)
         return result
 
     except SlackApiError as e:
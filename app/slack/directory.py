@@ -0,0 +1,273 @@
+"""
+Directory of Slack user and channel metadata
+
+Names, display names and time zones are stored in the slack_users and
+slack_channels tables and fronted by an in-process TTL/LRU cache, so API
+responses can be enriched without calling users.info or conversations.info.
+The tables are bulk-warmed from users.list/conversations.list and kept fresh
+from user_change and channel_rename events.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from slack.errors import SlackApiError
+from app.database.db import db, SlackUser, SlackChannel
+from app.slack.client import slack_client
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Page size for users.list / conversations.list
+PAGE_SIZE = 200
+
+# Times one page is retried after a ratelimited error before giving up
+MAX_RATE_LIMIT_RETRIES = 5
+
+
+class DirectoryCache:
+    """Thread-safe LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, max_size=10000, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide cache - sized from the app config in init_directory
+directory_cache = DirectoryCache()
+
+
+def _user_fields(user):
+    profile = user.get("profile") or {}
+    return {
+        "name": user.get("name"),
+        "real_name": user.get("real_name") or profile.get("real_name"),
+        "display_name": profile.get("display_name"),
+        "tz": user.get("tz"),
+    }
+
+
+def store_users(users):
+    """
+    Upsert Slack user objects into the directory and refresh the cache.
+    The caller is responsible for committing the session.
+
+    Args:
+        users (list): User objects as returned by users.list or user_change
+    """
+    users = [user for user in users if user.get("id")]
+    existing = {row.user_id: row for row in SlackUser.query.filter(
+        SlackUser.user_id.in_([user["id"] for user in users])).all()}
+
+    for user in users:
+        row = existing.get(user["id"])
+        if row is None:
+            row = SlackUser(user_id=user["id"])
+            db.session.add(row)
+
+        for field, value in _user_fields(user).items():
+            setattr(row, field, value)
+
+        directory_cache.set(("user", row.user_id), row.to_dict())
+
+
+def store_channels(channels):
+    """
+    Upsert Slack channel objects into the directory and refresh the cache.
+    The caller is responsible for committing the session.
+
+    Args:
+        channels (list): Channel objects as returned by conversations.list or channel_rename
+    """
+    channels = [channel for channel in channels if channel.get("id")]
+    existing = {row.channel_id: row for row in SlackChannel.query.filter(
+        SlackChannel.channel_id.in_([channel["id"] for channel in channels])).all()}
+
+    for channel in channels:
+        row = existing.get(channel["id"])
+        if row is None:
+            row = SlackChannel(channel_id=channel["id"])
+            db.session.add(row)
+
+        row.name = channel.get("name", row.name)
+        if "is_private" in channel:
+            row.is_private = bool(channel["is_private"])
+
+        directory_cache.set(("channel", row.channel_id), row.to_dict())
+
+
+def _paginate(method, key, **kwargs):
+    """
+    Yield each page of a cursor-paginated Slack list method
+
+    users.list is Tier 2, so a large workspace hits the rate limit partway
+    through; a ratelimited page is retried from the same cursor after the
+    Retry-After delay Slack asks for.
+    """
+    cursor = None
+    retries = 0
+    while True:
+        page_args = dict(kwargs, limit=PAGE_SIZE)
+        if cursor:
+            page_args["cursor"] = cursor
+
+        try:
+            response = method(**page_args)
+        except SlackApiError as e:
+            if e.response["error"] != "ratelimited" or retries >= MAX_RATE_LIMIT_RETRIES:
+                raise
+            headers = e.response.headers or {}
+            delay = int(headers.get("Retry-After") or headers.get("retry-after") or 1)
+            retries += 1
+            logger.warning(f"Rate limited listing {key}, retrying in {delay}s")
+            time.sleep(delay)
+            continue
+
+        retries = 0
+        yield response[key]
+
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return
+
+
+def warm_directory():
+    """
+    Bulk-load every user and channel of the workspace into the directory
+
+    Returns:
+        dict: Number of users and channels loaded
+    """
+    counts = {"users": 0, "channels": 0}
+
+    try:
+        for users in _paginate(slack_client.users_list, "members"):
+            store_users(users)
+            db.session.commit()
+            counts["users"] += len(users)
+
+        for channels in _paginate(slack_client.conversations_list, "channels",
+                                  types="public_channel,private_channel",
+                                  exclude_archived=True):
+            store_channels(channels)
+            db.session.commit()
+            counts["channels"] += len(channels)
+
+    except SlackApiError as e:
+        logger.error(f"Error warming directory: {e.response['error']}")
+
+    logger.info(
+        f"Directory warmed with {counts['users']} users and {counts['channels']} channels")
+    return counts
+
+
+def _lookup(kind, model, key_column, ids):
+    ids = {id_ for id_ in ids if id_}
+    found = {}
+    misses = []
+
+    for id_ in ids:
+        entry = directory_cache.get((kind, id_))
+        if entry is None:
+            misses.append(id_)
+        else:
+            found[id_] = entry
+
+    # One IN query for everything the cache did not have; never calls Slack
+    if misses:
+        for row in model.query.filter(key_column.in_(misses)).all():
+            entry = row.to_dict()
+            directory_cache.set((kind, entry["id"]), entry)
+            found[entry["id"]] = entry
+
+    return found
+
+
+def lookup_users(user_ids):
+    """
+    Resolve user IDs from the cache, falling back to the directory table
+
+    Returns:
+        dict: user_id -> user info for every known ID
+    """
+    return _lookup("user", SlackUser, SlackUser.user_id, user_ids)
+
+
+def lookup_channels(channel_ids):
+    """
+    Resolve channel IDs from the cache, falling back to the directory table
+
+    Returns:
+        dict: channel_id -> channel info for every known ID
+    """
+    return _lookup("channel", SlackChannel, SlackChannel.channel_id, channel_ids)
+
+
+def handle_user_change(event_data):
+    """
+    Handle user_change events from Slack
+    """
+    user = event_data.get("event", {}).get("user")
+    if isinstance(user, dict):
+        store_users([user])
+        db.session.commit()
+
+
+def handle_channel_rename(event_data):
+    """
+    Handle channel_rename events from Slack
+    """
+    channel = event_data.get("event", {}).get("channel")
+    if isinstance(channel, dict):
+        store_channels([channel])
+        db.session.commit()
+
+
+def init_directory(app):
+    """
+    Size the directory cache from the app config and optionally warm it
+
+    Config keys: DIRECTORY_CACHE_SIZE (default 10000), DIRECTORY_CACHE_TTL in
+    seconds (default 3600) and DIRECTORY_WARM_ON_START (default False).
+    """
+    directory_cache.max_size = app.config.get('DIRECTORY_CACHE_SIZE', 10000)
+    directory_cache.ttl = app.config.get('DIRECTORY_CACHE_TTL', 3600)
+    directory_cache.clear()
+
+    if app.config.get('DIRECTORY_WARM_ON_START'):
+        def warm():
+            with app.app_context():
+                warm_directory()
+
+        threading.Thread(target=warm, name='directory-warm', daemon=True).start()
+
+    return app
@@ -6,8 +6,16 @@ import logging
 from pathlib import Path
 from dotenv import load_dotenv
 from slackeventsapi import SlackEventAdapter
+from sqlalchemy.exc import IntegrityError
 from flask import Blueprint, jsonify, request
-from app.database.db import db, Message
+from app.database.db import db, Message, Thread
+from app.slack.directory import handle_user_change, handle_channel_rename
+from app.logs import log_event
+from app.alerts import keyword_watcher, scan_message
+from app.dedup import tag_duplicate
+from app.activity import record_activity
+from app.trends import track_message
+from app.stream import publish_message
 from datetime import datetime
 
 
@@ -16,7 +24,6 @@ load_dotenv(dotenv_path=env_path)
 
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Create blueprint for other routes if needed
@@ -43,11 +50,16 @@ def handle_message(event_data):
     user = event.get("user")
     text = event.get("text")
     ts = event.get("ts")
+    thread_ts = event.get("thread_ts") or ts
+    parent_user_id = event.get("parent_user_id")
     team_id = event_data.get("team_id")
     event_id = event_data.get("event_id")
 
     if channel and user and text:
-        logger.info(f"Message from {user} in {channel}: {text}")
+        # Slack redelivers events it did not see acknowledged in time
+        if event_id and Message.query.filter_by(event_id=event_id).first() is not None:
+            logger.info(f"Skipping redelivered event {event_id}")
+            return
 
         # Store message in database
         message = Message(
@@ -59,14 +71,51 @@ def handle_message(event_data):
                 "event_id": event_id,
                 "team_id": team_id,
                 "direction": "incoming"  # Mark as an incoming message
-            }
+            },
+            direction="incoming",
+            event_id=event_id,
+            thread_ts=thread_ts,
+            parent_user_id=parent_user_id
         )
 
         db.session.add(message)
-        db.session.commit()
 
-        logger.info(
-            f"Stored incoming message from {user} in channel {channel}")
+        # Replies bump the thread summary in the same transaction
+        if thread_ts != ts:
+            Thread.record_reply(channel, thread_ts, parent_user_id)
+
+        # Watch-term alerts are stored with the message
+        alerts = scan_message(message)
+
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if event_id and Message.query.filter_by(event_id=event_id).first() is not None:
+                # A concurrent redelivery of the same event was stored first
+                logger.info(f"Skipping redelivered event {event_id}")
+                return
+            raise
+
+        # The in-memory duplicate detector, activity cache and vibe trends only
+        # see committed messages, so a rolled back or redelivered message is
+        # never counted. Each step commits on its own, and a failing step does
+        # not lose the message.
+        for step in (tag_duplicate, record_activity, track_message):
+            try:
+                step(message)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error in {step.__name__} for message {message.id}: {e}")
+
+        publish_message(message)
+        keyword_watcher.notify(alerts)
+
+        log_event(logger, "message.stored",
+                  f"Stored incoming message from {user} in channel {channel}",
+                  user_id=user, channel_id=channel, thread_ts=thread_ts,
+                  message_text=text)
 
 
 def init_events(app):
@@ -86,6 +135,10 @@ def init_events(app):
         # Register message event handler
         slack_events_adapter.on("message")(handle_message)
 
+        # Keep the user/channel directory fresh
+        slack_events_adapter.on("user_change")(handle_user_change)
+        slack_events_adapter.on("channel_rename")(handle_channel_rename)
+
         # Register the blueprint for any other custom endpoints
         app.register_blueprint(events_bp)
 
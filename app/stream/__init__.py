@@ -0,0 +1 @@
+from app.stream.broker import message_broker, publish_message, init_stream, SubscriberLimitError
@@ -0,0 +1,156 @@
+"""
+In-process pub/sub for newly stored messages, consumed by the SSE stream endpoint
+
+Publishing only appends to the bounded buffers of matching subscribers, so it
+never blocks on a slow client. A subscriber whose buffer overflows is dropped
+and can reconnect with Last-Event-ID to replay what it missed from the
+database. The broker starts no threads; each stream waits on its own event, so
+under a cooperative server (e.g. gunicorn with gevent workers) hundreds of
+streams cost a greenlet each rather than an OS thread.
+"""
+import logging
+import threading
+from collections import deque
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+FILTER_FIELDS = ("user_id", "channel_id", "direction")
+
+
+class SubscriberLimitError(Exception):
+    """Raised when the broker already has its maximum number of subscribers"""
+
+
+class Subscription:
+    """
+    One stream's filters and bounded buffer of pending messages
+
+    Args:
+        filters (dict): Optional user_id, channel_id and direction to match
+        buffer_size (int): Messages buffered before the subscriber is dropped
+    """
+
+    def __init__(self, filters, buffer_size):
+        self.filters = {k: v for k, v in filters.items() if k in FILTER_FIELDS and v}
+        self.buffer_size = buffer_size
+        self.dropped = False
+        self._buffer = deque()
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def matches(self, message):
+        for field, value in self.filters.items():
+            if field == "direction":
+                if (message.get("metadata") or {}).get("direction") != value:
+                    return False
+            elif message.get(field) != value:
+                return False
+        return True
+
+    def push(self, message):
+        """Buffer a message; returns False if the subscriber had to be dropped"""
+        with self._lock:
+            if self.dropped:
+                return False
+            if len(self._buffer) >= self.buffer_size:
+                self.dropped = True
+                self._buffer.clear()
+                self._ready.set()
+                return False
+            self._buffer.append(message)
+        self._ready.set()
+        return True
+
+    def drain(self, timeout):
+        """
+        Wait up to timeout seconds for messages
+
+        Returns:
+            list: Buffered messages, oldest first (empty on timeout or drop)
+        """
+        self._ready.wait(timeout)
+        with self._lock:
+            messages = list(self._buffer)
+            self._buffer.clear()
+            self._ready.clear()
+        return messages
+
+
+class MessageBroker:
+    """
+    Fans stored messages out to stream subscribers
+
+    Args:
+        buffer_size (int): Per-subscriber buffer size
+        max_subscribers (int): Concurrent subscribers allowed
+    """
+
+    def __init__(self, buffer_size=100, max_subscribers=500):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def subscribe(self, **filters):
+        """
+        Register a subscriber
+
+        Raises:
+            SubscriberLimitError: If max_subscribers streams are already open
+        """
+        subscription = Subscription(filters, self.buffer_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise SubscriberLimitError(
+                    f"Stream limit of {self.max_subscribers} subscribers reached")
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, message):
+        """
+        Deliver a stored message (as returned by Message.to_dict) to matching subscribers
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            if subscription.matches(message) and not subscription.push(message):
+                self.unsubscribe(subscription)
+                logger.warning("Dropped slow stream subscriber")
+
+
+# Process-wide broker - configured in init_stream
+message_broker = MessageBroker()
+
+
+def publish_message(message):
+    """
+    Publish a committed Message to stream subscribers
+
+    Args:
+        message (Message): The stored message
+    """
+    # Skip serialization entirely when nobody is listening
+    if message_broker.has_subscribers():
+        message_broker.publish(message.to_dict())
+
+
+def init_stream(app):
+    """
+    Configure the message broker from the app config
+
+    Config keys: STREAM_BUFFER_SIZE (default 100), STREAM_MAX_SUBSCRIBERS
+    (default 500), STREAM_HEARTBEAT in seconds (default 15) and
+    STREAM_REPLAY_LIMIT, the most messages replayed on resume (default 1000).
+    """
+    message_broker.buffer_size = app.config.get('STREAM_BUFFER_SIZE', 100)
+    message_broker.max_subscribers = app.config.get('STREAM_MAX_SUBSCRIBERS', 500)
+    return app
@@ -0,0 +1,2 @@
+from app.trends.tracker import trend_tracker, track_message, checkpoint, init_trends
+from app.trends.vibe import score_vibe
@@ -0,0 +1,423 @@
+"""
+Streaming vibe and activity trends per user and per channel
+
+Every tracked user and channel owns one slot in a SlotStore, whose columns are
+flat arrays of doubles, so each entity costs a few dozen bytes and each message
+is an O(1) update of two slots. Per metric a slot keeps an exponentially
+weighted mean and variance (the long-term baseline) and a fast-moving mean
+(the current level). A drop is raised when the current level falls more than
+TRENDS_DROP_THRESHOLD standard deviations below the baseline, and re-armed
+once it has recovered halfway.
+
+Metrics:
+- vibe: the lexicon score of each message that carries a mood signal
+- activity: log messages per hour, from the gap since the entity's last message
+
+Dirty slots are checkpointed to trend_states in the background and restored on
+start. The checkpoint also sweeps for entities whose silence alone implies an
+activity drop.
+"""
+import logging
+import math
+import struct
+import threading
+import time
+from array import array
+from app.database.db import db, TrendState, TrendAnomaly
+from app.logs import log_event
+from app.trends.vibe import score_vibe
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SCOPES = ("user", "channel")
+METRICS = ("vibe", "activity")
+_FLAG_BITS = {"vibe": 1, "activity": 2}
+
+# Per metric: mean, var, fast (doubles) and sample count; then last_seen and flags
+_PACKED = struct.Struct("<dddI dddI dB")
+
+# Gaps are clamped so bursts and long absences stay finite
+MIN_GAP = 1.0
+MAX_GAP = 90 * 86400
+
+
+class EwmaColumns:
+    """Exponentially weighted statistics of one metric, one slot per entity"""
+
+    __slots__ = ("mean", "var", "fast", "count")
+
+    def __init__(self):
+        self.mean = array("d")
+        self.var = array("d")
+        self.fast = array("d")
+        self.count = array("I")
+
+    def append(self):
+        for column in (self.mean, self.var, self.fast, self.count):
+            column.append(0)
+
+    def update(self, slot, value, alpha, fast_alpha):
+        """Fold a sample into the slot's baseline and current level"""
+        if self.count[slot] == 0:
+            self.mean[slot] = self.fast[slot] = value
+            self.var[slot] = 0.0
+        else:
+            diff = value - self.mean[slot]
+            increment = alpha * diff
+            self.mean[slot] += increment
+            self.var[slot] = (1 - alpha) * (self.var[slot] + diff * increment)
+            self.fast[slot] += fast_alpha * (value - self.fast[slot])
+
+        if self.count[slot] < 0xFFFFFFFF:
+            self.count[slot] += 1
+
+
+class SlotStore:
+    """Array-backed trend state of every entity in one scope"""
+
+    def __init__(self):
+        self.slots = {}
+        self.keys = []
+        self.metrics = {metric: EwmaColumns() for metric in METRICS}
+        self.last_seen = array("d")
+        self.flags = bytearray()
+        self.dirty = set()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def slot(self, key):
+        """Return the entity's slot, allocating one if needed"""
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.slots[key] = len(self.keys)
+            self.keys.append(key)
+            for columns in self.metrics.values():
+                columns.append()
+            self.last_seen.append(0.0)
+            self.flags.append(0)
+        return slot
+
+    def pack(self, slot):
+        values = []
+        for columns in self.metrics.values():
+            values += (columns.mean[slot], columns.var[slot],
+                       columns.fast[slot], columns.count[slot])
+        return _PACKED.pack(*values, self.last_seen[slot], self.flags[slot])
+
+    def unpack(self, slot, data):
+        values = _PACKED.unpack(data)
+        for i, columns in enumerate(self.metrics.values()):
+            (columns.mean[slot], columns.var[slot],
+             columns.fast[slot], columns.count[slot]) = values[i * 4:i * 4 + 4]
+        self.last_seen[slot], self.flags[slot] = values[-2:]
+
+    def to_dict(self, slot):
+        result = {"last_seen": self.last_seen[slot] or None}
+        for metric, columns in self.metrics.items():
+            result[metric] = {
+                "baseline": columns.mean[slot],
+                "std_dev": math.sqrt(columns.var[slot]),
+                "current": columns.fast[slot],
+                "samples": columns.count[slot],
+                "dropped": bool(self.flags[slot] & _FLAG_BITS[metric])
+            }
+        return result
+
+
+class TrendTracker:
+    """
+    Maintains vibe and activity trends and detects sharp drops
+
+    Args:
+        alpha (float): Weight of a new sample in the baseline mean and variance
+        fast_alpha (float): Weight of a new sample in the current level
+        threshold (float): Standard deviations below baseline that count as a drop
+        min_samples (int): Samples a metric needs before drops are raised
+        min_drop (dict): Smallest absolute drop per metric, which keeps very
+            steady entities from alerting on tiny dips
+    """
+
+    def __init__(self, alpha=0.05, fast_alpha=0.3, threshold=2.0, min_samples=10,
+                 min_drop=None):
+        self._lock = threading.Lock()
+        self.configure(alpha, fast_alpha, threshold, min_samples, min_drop)
+
+    def configure(self, alpha, fast_alpha, threshold, min_samples, min_drop=None):
+        """Apply new settings, starting from empty state"""
+        with self._lock:
+            self.alpha = alpha
+            self.fast_alpha = fast_alpha
+            self.threshold = threshold
+            self.min_samples = min_samples
+            # Vibe is in [-1, 1]; an activity drop of log(2) halves the rate
+            self.min_drop = {"vibe": 0.3, "activity": math.log(2), **(min_drop or {})}
+            self.stores = {scope: SlotStore() for scope in SCOPES}
+
+    def _check(self, store, slot, metric, value, baseline, std_dev):
+        """Update the slot's drop flag, returning True on a new drop"""
+        if store.metrics[metric].count[slot] < self.min_samples:
+            return False
+
+        margin = max(self.threshold * std_dev, self.min_drop[metric])
+        bit = _FLAG_BITS[metric]
+
+        if value < baseline - margin:
+            if not store.flags[slot] & bit:
+                store.flags[slot] |= bit
+                return True
+        elif store.flags[slot] & bit and value >= baseline - margin / 2:
+            store.flags[slot] &= ~bit
+        return False
+
+    def _update(self, scope, key, store, slot, metric, value, anomalies):
+        """
+        Fold a sample into a metric. The current level is compared with the
+        baseline from before the sample, so a sudden drop is not hidden by the
+        variance it adds.
+        """
+        columns = store.metrics[metric]
+        baseline, std_dev = columns.mean[slot], math.sqrt(columns.var[slot])
+        columns.update(slot, value, self.alpha, self.fast_alpha)
+
+        if self._check(store, slot, metric, columns.fast[slot], baseline, std_dev):
+            anomalies.append(self._anomaly(
+                scope, key, metric, columns.fast[slot], baseline, std_dev))
+
+    def _anomaly(self, scope, key, metric, value, baseline, std_dev):
+        return {"scope": scope, "entity_id": key, "metric": metric,
+                "value": value, "baseline": baseline, "std_dev": std_dev}
+
+    def observe(self, user_id, channel_id, vibe, seen_at):
+        """
+        Update the user's and the channel's trends with one message
+
+        Args:
+            user_id (str): The author
+            channel_id (str): The channel
+            vibe (float): The message's vibe score, or None if it has none
+            seen_at (float): Message time in seconds
+
+        Returns:
+            list: Anomaly dicts for metrics that just crossed the drop threshold
+        """
+        anomalies = []
+        with self._lock:
+            for scope, key in (("user", user_id), ("channel", channel_id)):
+                store = self.stores[scope]
+                slot = store.slot(key)
+
+                if vibe is not None:
+                    self._update(scope, key, store, slot, "vibe", vibe, anomalies)
+
+                last_seen = store.last_seen[slot]
+                if last_seen:
+                    gap = min(max(seen_at - last_seen, MIN_GAP), MAX_GAP)
+                    self._update(scope, key, store, slot, "activity",
+                                 math.log(3600 / gap), anomalies)
+
+                store.last_seen[slot] = max(last_seen, seen_at)
+                store.dirty.add(slot)
+
+        return anomalies
+
+    def sweep(self, now):
+        """
+        Raise activity drops for entities that have gone quiet: the rate
+        implied by their silence so far is checked without being recorded
+
+        Returns:
+            list: Anomaly dicts
+        """
+        anomalies = []
+        with self._lock:
+            for scope, store in self.stores.items():
+                for slot, last_seen in enumerate(store.last_seen):
+                    if not last_seen or store.flags[slot] & _FLAG_BITS["activity"]:
+                        continue
+                    gap = min(max(now - last_seen, MIN_GAP), MAX_GAP)
+                    value = math.log(3600 / gap)
+                    columns = store.metrics["activity"]
+                    baseline, std_dev = columns.mean[slot], math.sqrt(columns.var[slot])
+                    if self._check(store, slot, "activity", value, baseline, std_dev):
+                        store.dirty.add(slot)
+                        anomalies.append(self._anomaly(
+                            scope, store.keys[slot], "activity", value,
+                            baseline, std_dev))
+        return anomalies
+
+    def state(self, scope, key):
+        """Return an entity's current trend state, or None if it is not tracked"""
+        with self._lock:
+            store = self.stores[scope]
+            slot = store.slots.get(key)
+            return store.to_dict(slot) if slot is not None else None
+
+    def take_dirty(self):
+        """
+        Pack and clear the slots changed since the last call
+
+        Returns:
+            list: (scope, entity_id, packed state) tuples
+        """
+        with self._lock:
+            changed = []
+            for scope, store in self.stores.items():
+                changed += [(scope, store.keys[slot], store.pack(slot))
+                            for slot in store.dirty]
+                store.dirty.clear()
+            return changed
+
+    def restore(self, scope, key, data):
+        """Load an entity's checkpointed state"""
+        with self._lock:
+            store = self.stores[scope]
+            store.unpack(store.slot(key), data)
+
+
+# Process-wide tracker - configured in init_trends
+trend_tracker = TrendTracker()
+
+
+def _stage_anomalies(anomalies, message_id=None):
+    rows = []
+    for anomaly in anomalies:
+        row = TrendAnomaly(message_id=message_id, **anomaly)
+        db.session.add(row)
+        rows.append(row)
+        log_event(logger, "trend.anomaly",
+                  f"{anomaly['metric']} drop for {anomaly['scope']} {anomaly['entity_id']}",
+                  level=logging.WARNING, **anomaly)
+    return rows
+
+
+def track_message(message):
+    """
+    Update the trend tracker with a stored message and stage a TrendAnomaly
+    per new drop. The caller is responsible for committing the session.
+
+    Args:
+        message (Message): The stored message, already committed so a rolled
+            back message never reaches the tracker
+
+    Returns:
+        list: The staged TrendAnomaly objects
+    """
+    slack_ts = (message.message_metadata or {}).get("slack_ts")
+    try:
+        seen_at = float(slack_ts) if slack_ts else time.time()
+    except ValueError:
+        seen_at = time.time()
+
+    anomalies = trend_tracker.observe(
+        message.user_id, message.channel_id,
+        score_vibe(message.message_text), seen_at)
+    return _stage_anomalies(anomalies, message.id)
+
+
+def checkpoint(now=None, batch_size=500):
+    """
+    Sweep for silent entities and write changed tracker state to trend_states
+
+    Returns:
+        int: Number of states written
+    """
+    _stage_anomalies(trend_tracker.sweep(now or time.time()))
+    changed = trend_tracker.take_dirty()
+
+    for scope in SCOPES:
+        states = {key: data for s, key, data in changed if s == scope}
+        keys = list(states)
+        for i in range(0, len(keys), batch_size):
+            batch = keys[i:i + batch_size]
+            existing = {row.entity_id: row for row in TrendState.query.filter(
+                TrendState.scope == scope, TrendState.entity_id.in_(batch))}
+            for key in batch:
+                row = existing.get(key)
+                if row is None:
+                    db.session.add(TrendState(
+                        scope=scope, entity_id=key, state=states[key]))
+                else:
+                    row.state = states[key]
+
+    db.session.commit()
+    return len(changed)
+
+
+def restore_trends():
+    """Load every checkpointed state into the tracker"""
+    count = 0
+    for row in TrendState.query.yield_per(1000):
+        trend_tracker.restore(row.scope, row.entity_id, row.state)
+        count += 1
+    return count
+
+
+class TrendCheckpointer:
+    """Background thread that checkpoints the tracker every interval seconds"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the checkpoint loop in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name='trend-checkpoint', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the loop after a final checkpoint"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _loop(self):
+        while True:
+            stopping = self._stop.wait(self.interval)
+            try:
+                with self.app.app_context():
+                    checkpoint()
+            except Exception as e:
+                logger.error(f"Trend checkpoint failed: {e}")
+            if stopping:
+                return
+
+
+def init_trends(app):
+    """
+    Configure the trend tracker from the app config and restore its state
+
+    Config keys: TRENDS_ALPHA (default 0.05), TRENDS_FAST_ALPHA (default 0.3),
+    TRENDS_DROP_THRESHOLD in standard deviations (default 2.0),
+    TRENDS_MIN_SAMPLES (default 10), TRENDS_MIN_DROP, a dict of the smallest
+    absolute drop per metric, and TRENDS_CHECKPOINT_INTERVAL in seconds
+    (default 60; 0 disables background checkpoints).
+    """
+    trend_tracker.configure(
+        alpha=app.config.get('TRENDS_ALPHA', 0.05),
+        fast_alpha=app.config.get('TRENDS_FAST_ALPHA', 0.3),
+        threshold=app.config.get('TRENDS_DROP_THRESHOLD', 2.0),
+        min_samples=app.config.get('TRENDS_MIN_SAMPLES', 10),
+        min_drop=app.config.get('TRENDS_MIN_DROP')
+    )
+
+    with app.app_context():
+        restored = restore_trends()
+    if restored:
+        logger.info(f"Restored trend state of {restored} users and channels")
+
+    interval = app.config.get('TRENDS_CHECKPOINT_INTERVAL', 60)
+    if interval:
+        checkpointer = TrendCheckpointer(app, interval)
+        app.extensions['trend_checkpointer'] = checkpointer
+        checkpointer.start()
+
+    return app
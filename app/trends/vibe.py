@@ -0,0 +1,69 @@
+"""
+Lexicon-based vibe score of a message
+"""
+import re
+
+POSITIVE = frozenset("""
+    good great awesome amazing excellent happy glad love loved loving nice cool
+    fantastic wonderful excited exciting fun thanks thank thx appreciate
+    appreciated proud calm relaxed productive energized motivated smooth win
+    won enjoy enjoyed enjoying perfect better best fine helpful yay woohoo
+    :smile: :smiley: :grinning: :joy: :heart: :tada: :raised_hands: :clap:
+    :+1: :thumbsup: :muscle: :sunglasses: :star-struck: :partying_face:
+""".split())
+
+NEGATIVE = frozenset("""
+    bad terrible awful horrible sad unhappy upset angry annoyed annoying
+    frustrated frustrating tired exhausted stressed stressful overwhelmed
+    burned burnt burnout anxious worried worry hate hated sick bored boring
+    blocked stuck broken worse worst fail failed failing struggling struggle
+    difficult hard lonely disappointed disappointing ugh meh
+    :cry: :sob: :disappointed: :rage: :angry: :weary: :tired_face: :-1:
+    :thumbsdown: :confused: :worried: :persevere: :face_with_head_bandage:
+""".split())
+
+NEGATORS = frozenset("""
+    not no never dont don't isn't wasn't aren't can't cannot won't
+    didn't doesn't hardly barely
+""".split())
+
+# Tokens a negator reaches, e.g. "not very good"
+NEGATION_SPAN = 2
+
+_TOKENS = re.compile(r":[a-z0-9_+\-]+:|[a-z']+")
+
+# Bare replies to a 1-5 pulse question ("how are you feeling this week?")
+_PULSE_REPLY = re.compile(r"^\s*([1-5])\s*(?:/\s*5)?\s*[.!]*\s*$")
+
+
+def score_vibe(text):
+    """
+    Score the mood of a message
+
+    Each positive or negative lexicon word (or emoji) counts +1 or -1, flipped
+    when one of the previous two tokens is a negator, and the score is their
+    mean. A bare 1-5 reply to a pulse check-in maps linearly onto the range.
+
+    Args:
+        text (str): The message text
+
+    Returns:
+        float: The vibe in [-1, 1], or None if the message carries no mood signal
+    """
+    pulse = _PULSE_REPLY.match(text)
+    if pulse:
+        return (int(pulse.group(1)) - 3) / 2
+
+    total = hits = 0
+    negated_until = -1
+    for i, token in enumerate(_TOKENS.findall(text.lower())):
+        if token in NEGATORS:
+            negated_until = i + NEGATION_SPAN
+            continue
+
+        polarity = (token in POSITIVE) - (token in NEGATIVE)
+        if polarity:
+            total += -polarity if i <= negated_until else polarity
+            hits += 1
+
+    return total / hits if hits else None
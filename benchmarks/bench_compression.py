@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Benchmark dictionary-compressed message storage
+
+Stores a synthetic mix of pulse check-ins, greetings, bot templates and free
+text in an in-memory database, once plain and once compressed with a trained
+zstd dictionary, and reports the stored size of the text and metadata
+(plain and compressed columns together) plus the cost of loading the messages through
+Message.to_dict() (the read path every API response takes).
+
+Usage:
+    python benchmarks/bench_compression.py --messages 20000 --dict-size 32768
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URI"] = "sqlite:///:memory:"
+
+from app import create_app  # noqa: E402
+from app.database.compression import codec, train_dictionary, recompress_messages  # noqa: E402
+from app.database.db import db, Message  # noqa: E402
+
+GREETINGS = ["Hi", "Hey", "Good morning", "Hello", "Thanks", "Morning all"]
+TEMPLATES = [
+    "{g} <@{user}>! How are you feeling about work this week? Reply with a number from 1 to 5.",
+    "{g} <@{user}>, quick pulse check: how was your energy level today?",
+    ":white_check_mark: Deploy of service-{n} to production finished in {n}s",
+    ":warning: Build #{n} failed on main, see <https://ci.example.com/{n}|details>",
+    "{g} team! Standup notes for sprint {n} are in the channel topic",
+]
+
+
+def random_text(rng):
+    if rng.random() < 0.7:
+        return rng.choice(TEMPLATES).format(
+            g=rng.choice(GREETINGS), user=f"U{rng.randint(0, 99999):05d}",
+            n=rng.randint(1, 999))
+    return " ".join("".join(rng.choice(string.ascii_lowercase)
+                            for _ in range(rng.randint(2, 9)))
+                    for _ in range(rng.randint(3, 25)))
+
+
+def stored_bytes():
+    return db.session.execute(db.text(
+        "SELECT sum(length(CAST(message_text AS BLOB)) + ifnull(length(compressed_text), 0)), "
+        "sum(ifnull(length(CAST(message_metadata AS BLOB)), 0) + "
+        "ifnull(length(compressed_metadata), 0)) FROM messages")).one()
+
+
+def time_reads(rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        db.session.expire_all()
+        start = time.perf_counter()
+        rows = [m.to_dict() for m in Message.query.all()]
+        best = min(best, time.perf_counter() - start)
+    return best, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark message compression")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--dict-size", type=int, default=32768)
+    parser.add_argument("--samples", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = create_app({"TESTING": True, "COMPRESSION_JOB_INTERVAL": 0})
+
+    with app.app_context():
+        for i in range(args.messages):
+            direction = rng.choice(["incoming", "outgoing"])
+            db.session.add(Message(
+                user_id=f"U{i % 5000:05d}", channel_id=f"C{i % 40:03d}",
+                message_text=random_text(rng), direction=direction,
+                message_metadata={"slack_ts": f"{1700000000 + i}.{i % 1000000:06d}",
+                                  "event_id": f"Ev{i:08d}", "team_id": "T0001",
+                                  "direction": direction}))
+        db.session.commit()
+
+        plain_text, plain_meta = stored_bytes()
+        plain_read, n = time_reads(args.rounds)
+
+        codec.configure(True)
+        start = time.perf_counter()
+        dictionary = train_dictionary(args.samples, args.dict_size)
+        dict_id, dict_bytes = dictionary.id, len(dictionary.data)
+        trained = time.perf_counter()
+        recompress_messages(before=datetime.utcnow() + timedelta(seconds=1))
+        rewrite_time = time.perf_counter() - trained
+
+        text_bytes, meta_bytes = stored_bytes()
+        compressed_read, _ = time_reads(args.rounds)
+
+    print(f"{n} messages, dictionary {dict_id}: {dict_bytes} bytes "
+          f"trained in {(trained - start) * 1e3:.0f} ms")
+    print(f"message_text:     {plain_text:>10} -> {text_bytes:>10} bytes "
+          f"(ratio {plain_text / text_bytes:.2f}x)")
+    print(f"message_metadata: {plain_meta:>10} -> {meta_bytes:>10} bytes "
+          f"(ratio {plain_meta / meta_bytes:.2f}x)")
+    print(f"recompress:       {rewrite_time / n * 1e6:8.1f} us/msg")
+    print(f"read plain:       {plain_read / n * 1e6:8.1f} us/msg")
+    print(f"read compressed:  {compressed_read / n * 1e6:8.1f} us/msg "
+          f"(+{(compressed_read - plain_read) / n * 1e6:.1f} us decompression)")
+
+
+if __name__ == "__main__":
+    main()
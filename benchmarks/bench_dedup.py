@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Benchmark near-duplicate detection cost per message
+
+Feeds a synthetic stream of unique messages mixed with templated floods into a
+DuplicateDetector and reports the time spent hashing (MinHash signature), in
+the LSH lookup and both together, which is what ingest pays per message, plus
+how many flood copies were clustered.
+
+Usage:
+    python benchmarks/bench_dedup.py --messages 20000 --flood-rate 0.3
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.dedup.detector import DuplicateDetector  # noqa: E402
+from app.dedup.minhash import normalize  # noqa: E402
+
+
+def random_sentence(rng, words=(6, 30)):
+    return " ".join("".join(rng.choice(string.ascii_lowercase)
+                            for _ in range(rng.randint(2, 9)))
+                    for _ in range(rng.randint(*words)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark duplicate detection")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--flood-rate", type=float, default=0.3,
+                        help="Fraction of messages copied from flood templates")
+    parser.add_argument("--templates", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    templates = [random_sentence(rng, (10, 30)) for _ in range(args.templates)]
+    detector = DuplicateDetector(window=3600, max_entries=50000)
+
+    hash_time = lookup_time = 0.0
+    floods = clustered = 0
+
+    for i in range(args.messages):
+        if rng.random() < args.flood_rate:
+            # A copy with a small edit, like a re-posted announcement
+            text = rng.choice(templates) + f" ({rng.randint(1, 99)} people)"
+            floods += 1
+        else:
+            text = random_sentence(rng)
+
+        start = time.perf_counter()
+        signature = detector.hasher.signature(normalize(text))
+        hashed = time.perf_counter()
+        cluster = detector.index.query_and_add(signature, i, now=i * 0.1)
+        lookup_time += time.perf_counter() - hashed
+        hash_time += hashed - start
+        clustered += cluster is not None
+
+    n = args.messages
+    print(f"{n} messages, {floods} flood copies, {clustered} clustered as duplicates")
+    print(f"index size: {len(detector.index)} clusters")
+    print(f"minhash: {hash_time / n * 1e6:8.1f} us/msg")
+    print(f"lookup:  {lookup_time / n * 1e6:8.1f} us/msg")
+    print(f"total:   {(hash_time + lookup_time) / n * 1e6:8.1f} us/msg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import pytest
+from app import create_app
+
+# Every test app gets its own in-memory database and no background threads
+BASE_CONFIG = {
+    'TESTING': True,
+    'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+    'TRENDS_CHECKPOINT_INTERVAL': 0,
+    'COMPRESSION_JOB_INTERVAL': 0,
+}
+
+
+@pytest.fixture
+def make_app():
+    """Factory for test apps; keyword arguments override BASE_CONFIG"""
+    def make(**config):
+        return create_app({**BASE_CONFIG, **config})
+    return make
+
+
+@pytest.fixture
+def app_config():
+    """Per-feature config keys; override this fixture in a test module"""
+    return {}
+
+
+@pytest.fixture
+def app(make_app, app_config):
+    return make_app(**app_config)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
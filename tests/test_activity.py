@@ -0,0 +1,114 @@
+import json
+import random
+import time
+import pytest
+from app.activity import RoaringBitmap
+from sqlalchemy import event
+from app.database.db import db, ActivityBitmap
+
+
+def test_roaring_bitmap_set_operations():
+    rng = random.Random(3)
+    # Dense low range (bitset container) plus sparse high values (array containers)
+    a = set(range(0, 10000, 2)) | {rng.randrange(1 << 20) for _ in range(300)}
+    b = set(range(0, 10000, 3)) | {rng.randrange(1 << 20) for _ in range(300)}
+    bitmap_a, bitmap_b = RoaringBitmap(a), RoaringBitmap(b)
+
+    assert set(bitmap_a | bitmap_b) == a | b
+    assert set(bitmap_a & bitmap_b) == a & b
+    assert set(RoaringBitmap.union_all([bitmap_a, bitmap_b])) == a | b
+    assert len(bitmap_a) == len(a) and 4 in bitmap_a and 5 not in bitmap_a
+    assert RoaringBitmap.from_bytes(bitmap_a.to_bytes()) == bitmap_a
+
+
+def test_activity_index_heatmap_and_daily(app):
+    from app.slack.events import handle_message
+
+    # Two days ago, yesterday and this hour
+    now = int(time.time())
+    posts = [(now - 48 * 3600, "U1"), (now - 48 * 3600, "U2"),
+             (now - 24 * 3600, "U1"), (now, "U1"), (now, "U3"), (now + 1, "U3")]
+
+    with app.app_context():
+        for i, (ts, user) in enumerate(posts):
+            handle_message({"event": {
+                "channel": "C1", "user": user, "ts": f"{ts}.00010{i}",
+                "text": f"Update number {i} from {user}"}})
+        handle_message({"event": {
+            "channel": "C2", "user": "U4", "ts": f"{now}.000200", "text": "Hi"}})
+
+        assert ActivityBitmap.query.filter_by(channel_id="C1").count() == 3
+
+    # The user IDs of every hour come from a single ordinal lookup
+    lookups = []
+
+    def count_lookups(conn, cursor, statement, *args):
+        if 'FROM user_ordinals' in statement:
+            lookups.append(statement)
+
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count_lookups)
+    try:
+        data = json.loads(client.get(
+            '/api/channels/C1/activity?days=3&include_users=1').data)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_lookups)
+    assert len(lookups) == 1
+    assert data["distinct_users"] == 3
+    assert [h["active_users"] for h in data["hours"]] == [2, 1, 2]
+    assert data["hours"][-1]["user_ids"] == ["U1", "U3"]
+    assert sum(map(sum, data["by_hour_of_week"])) == 5
+
+    data = json.loads(client.get('/api/activity/daily?days=3').data)
+    assert data["distinct_users"] == 4
+    assert data["active_every_day"] == 1
+
+
+def test_concurrent_bucket_updates_are_merged(app):
+    from unittest.mock import patch
+    from app.activity.index import activity_index
+    from app.database.db import db, Message
+    from app.slack.events import handle_message
+
+    hour = int(time.time()) // 3600
+    ts = f"{hour * 3600 + 5}.000100"
+
+    with app.app_context():
+        handle_message({"event": {"channel": "C1", "user": "U1", "ts": ts, "text": "Hi"}})
+        u2 = activity_index.ordinal_for("U2")
+        u3 = activity_index.ordinal_for("U3")
+        db.session.commit()
+
+        # Another worker adds U2 after this one read the bucket
+        real_from_bytes = RoaringBitmap.from_bytes
+
+        def concurrent_update(data):
+            if concurrent_update.pending:
+                concurrent_update.pending = False
+                theirs = real_from_bytes(data)
+                theirs.add(u2)
+                ActivityBitmap.query.update({ActivityBitmap.bitmap: theirs.to_bytes()},
+                                            synchronize_session=False)
+            return real_from_bytes(data)
+        concurrent_update.pending = True
+
+        activity_index.clear()
+        with patch.object(RoaringBitmap, "from_bytes", side_effect=concurrent_update):
+            handle_message({"event": {"channel": "C1", "user": "U3", "ts": ts, "text": "Hey"}})
+
+        row = ActivityBitmap.query.one()
+        assert u2 in RoaringBitmap.from_bytes(row.bitmap)
+        assert u3 in RoaringBitmap.from_bytes(row.bitmap)
+
+        # Another worker created the bucket after this one found it missing
+        real_load = activity_index._load_bucket
+        with patch.object(activity_index, "_load_bucket",
+                          side_effect=[None, real_load("C1", hour)]) as load:
+            activity_index.clear()
+            handle_message({"event": {"channel": "C1", "user": "U4", "ts": ts, "text": "Yo"}})
+
+        assert load.call_count == 2
+        assert Message.query.count() == 3
+        assert len(RoaringBitmap.from_bytes(ActivityBitmap.query.one().bitmap)) == 4
@@ -0,0 +1,102 @@
+import json
+import os
+import time
+import pytest
+from unittest.mock import patch
+from app.alerts import KeywordMatcher, keyword_watcher
+from app.database.db import Alert
+
+
+@pytest.fixture
+def terms_file(tmp_path):
+    path = tmp_path / "terms.txt"
+    path.write_text("# watch terms\n[burnout]\nburned out\nexhausted\n[incident]\noutage\n")
+    return path
+
+
+@pytest.fixture
+def app_config(terms_file):
+    return {'ALERT_TERMS_FILE': str(terms_file), 'ALERT_RELOAD_INTERVAL': 3600}
+
+
+@pytest.fixture(autouse=True)
+def reset_watcher():
+    yield
+    keyword_watcher.terms_file = None
+    keyword_watcher.notify_channel = None
+
+
+def test_matcher_finds_whole_words_in_one_pass():
+    matcher = KeywordMatcher([("he", None), ("she", "x"), ("hers", None),
+                              ("burned out", "burnout")])
+    matches = matcher.find("Ushers said SHE was burned\n  out")
+
+    assert [(m.term, m.category) for m in matches] == \
+        [("she", "x"), ("burned out", "burnout")]
+    assert matches[1].start == 20 and matches[1].end == 32
+    assert matcher.find("nothing here") == []
+
+
+def test_ingest_stores_alerts_and_hot_reloads(app, terms_file):
+    from app.slack.events import handle_message
+
+    with app.app_context():
+        handle_message({"event": {
+            "channel": "C1", "user": "U1", "ts": "1.0",
+            "text": "Exhausted and burned out after the outage, so exhausted"}})
+        handle_message({"event": {
+            "channel": "C1", "user": "U2", "ts": "2.0", "text": "All good"}})
+
+        alerts = {a.term: a for a in Alert.query.all()}
+        assert set(alerts) == {"exhausted", "burned out", "outage"}
+        assert alerts["exhausted"].occurrences == 2
+        assert alerts["outage"].category == "incident"
+
+        # Edit the term file; the new matcher is swapped in on reload
+        terms_file.write_text("[morale]\nall good\n")
+        os.utime(terms_file, (0, 12345))
+        assert keyword_watcher.reload()
+        handle_message({"event": {
+            "channel": "C1", "user": "U3", "ts": "3.0", "text": "All  good"}})
+
+    response = app.test_client().get('/api/alerts?category=morale')
+    data = json.loads(response.data)
+    assert data["count"] == 1
+    assert data["alerts"][0]["user_id"] == "U3"
+
+
+@patch('app.alerts.keywords.slack_client')
+def test_alerts_notify_channel(mock_slack, app):
+    from app.database.db import Message
+    from app.slack.events import handle_message
+
+    keyword_watcher.notify_channel = "CALERTS"
+    with app.app_context():
+        handle_message({"event": {
+            "channel": "C1", "user": "U1", "ts": "1.0", "text": "Total outage"}})
+
+    keyword_watcher._notifier.submit(lambda: None).result()
+    mock_slack.chat_postMessage.assert_called_once()
+    assert mock_slack.chat_postMessage.call_args.kwargs["channel"] == "CALERTS"
+    assert "Total outage" not in mock_slack.chat_postMessage.call_args.kwargs["text"]
+
+    # The summary is not stored as a message of the flagged user
+    with app.app_context():
+        assert Message.query.filter_by(user_id="U1").count() == 1
+
+
+
+def test_watcher_survives_reload_errors():
+    from app.alerts.keywords import KeywordWatcher
+
+    watcher = KeywordWatcher()
+    errors = [UnicodeDecodeError("utf-8", b"", 0, 1, "bad"), None, None]
+    with patch.object(watcher, 'reload', side_effect=errors) as mock_reload:
+        watcher.watch(0.01)
+        deadline = time.time() + 2
+        while mock_reload.call_count < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        watcher.reload_interval = 3600
+
+    assert mock_reload.call_count >= 2
+    assert watcher._watch_thread.is_alive()
@@ -1,29 +1,10 @@
 import pytest
-from app import create_app
 from app.database.db import db as _db
 import json
 import os
 from unittest.mock import patch
 
 
-@pytest.fixture
-def app():
-    app = create_app({
-        'TESTING': True,
-        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
-    })
-
-    with app.app_context():
-        _db.create_all()
-
-    yield app
-
-
-@pytest.fixture
-def client(app):
-    return app.test_client()
-
-
 @pytest.fixture
 def db(app):
     with app.app_context():
@@ -106,3 +87,132 @@ def test_get_messages(client, db):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data["count"] == 1
+
+
+def test_thread_storage_and_retrieval(client, db):
+    from app.slack.events import handle_message
+    from app.database.db import Thread
+
+    # Thread root followed by two replies
+    handle_message({"event": {
+        "channel": "C1", "user": "U1", "text": "Root", "ts": "100.000100"}})
+    for i, user in enumerate(["U2", "U3"]):
+        handle_message({"event": {
+            "channel": "C1", "user": user, "text": f"Reply {i}",
+            "ts": f"10{i + 1}.000100", "thread_ts": "100.000100",
+            "parent_user_id": "U1"}})
+
+    # Unrelated top-level message in the same channel
+    handle_message({"event": {
+        "channel": "C1", "user": "U1", "text": "Other", "ts": "200.000100"}})
+
+    thread = Thread.query.filter_by(
+        channel_id="C1", thread_ts="100.000100").one()
+    assert thread.reply_count == 2
+    assert thread.parent_user_id == "U1"
+
+    response = client.get('/api/threads/C1/100.000100')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data["parent"]["message_text"] == "Root"
+    assert data["reply_count"] == 2
+    assert [r["message_text"] for r in data["replies"]] == ["Reply 0", "Reply 1"]
+    assert data["replies"][0]["parent_user_id"] == "U1"
+
+    response = client.get('/api/threads/C1/999.000000')
+    assert response.status_code == 404
+
+    response = client.get('/api/channels/C1/threads')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data["count"] == 1
+    assert data["threads"][0]["thread_ts"] == "100.000100"
+    assert data["threads"][0]["reply_count"] == 2
+
+
+def test_first_reply_race_keeps_the_reply(db):
+    from app.database.db import Message, Thread
+
+    # Another worker creates the thread row between our UPDATE and INSERT
+    db.session.add(Thread(channel_id="C1", thread_ts="1.0", reply_count=1))
+    db.session.commit()
+
+    db.session.add(Message(user_id="U2", channel_id="C1", message_text="Reply",
+                           thread_ts="1.0"))
+    real_bump = Thread._bump
+    calls = []
+
+    def bump(*args):
+        calls.append(args)
+        return 0 if len(calls) == 1 else real_bump(*args)
+
+    with patch.object(Thread, '_bump', side_effect=bump):
+        Thread.record_reply("C1", "1.0")
+    assert len(calls) == 2
+    db.session.commit()
+
+    assert Message.query.count() == 1
+    assert Thread.query.one().reply_count == 2
+
+
+@patch('app.slack.directory.slack_client')
+def test_get_messages_expand(mock_slack, client, db):
+    from app.database.db import Message
+    from app.slack.directory import directory_cache, handle_channel_rename
+
+    mock_slack.users_list.side_effect = [
+        {"members": [{"id": "U1", "name": "ann", "tz": "Asia/Kolkata",
+                      "profile": {"display_name": "Ann"}}],
+         "response_metadata": {"next_cursor": "page2"}},
+        {"members": [{"id": "U2", "name": "bob", "profile": {}}],
+         "response_metadata": {"next_cursor": ""}},
+    ]
+    mock_slack.conversations_list.return_value = {
+        "channels": [{"id": "C1", "name": "general", "is_private": False}]}
+
+    response = client.post('/api/directory/warm')
+    assert json.loads(response.data)["users"] == 2
+
+    handle_channel_rename({"event": {"channel": {"id": "C1", "name": "random"}}})
+
+    db.session.add(Message(user_id="U1", channel_id="C1", message_text="Hi"))
+    db.session.commit()
+
+    # Served from the database once the in-process cache is cold
+    directory_cache.clear()
+    mock_slack.reset_mock()
+
+    response = client.get('/api/messages?expand=user,channel')
+    message = json.loads(response.data)["messages"][0]
+    assert message["user"]["display_name"] == "Ann"
+    assert message["user"]["tz"] == "Asia/Kolkata"
+    assert message["channel"]["name"] == "random"
+    assert not mock_slack.method_calls
+
+    response = client.get('/api/messages')
+    assert "user" not in json.loads(response.data)["messages"][0]
+
+
+@patch('app.slack.directory.time.sleep')
+@patch('app.slack.directory.slack_client')
+def test_warm_directory_waits_out_rate_limits(mock_slack, mock_sleep, client, db):
+    from slack.errors import SlackApiError
+    from app.database.db import SlackUser
+
+    class RateLimited(dict):
+        headers = {"Retry-After": "7"}
+
+    mock_slack.users_list.side_effect = [
+        {"members": [{"id": "U1", "name": "ann"}],
+         "response_metadata": {"next_cursor": "page2"}},
+        SlackApiError("ratelimited", RateLimited(ok=False, error="ratelimited")),
+        {"members": [{"id": "U2", "name": "bob"}],
+         "response_metadata": {"next_cursor": ""}},
+    ]
+    mock_slack.conversations_list.return_value = {"channels": []}
+
+    response = client.post('/api/directory/warm')
+    assert json.loads(response.data)["users"] == 2
+    mock_sleep.assert_called_once_with(7)
+    assert mock_slack.users_list.call_args_list[2].kwargs["cursor"] == "page2"
+    assert SlackUser.query.count() == 2
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+from werkzeug.serving import make_server
+from app.database.db import db as _db, Message
+from vibemeter_client import VibeMeterClient, VibeMeterAPIError
+
+
+@pytest.fixture
+def server(app):
+    with app.app_context():
+        for i in range(25):
+            _db.session.add(Message(
+                user_id="U1" if i % 2 else "U2", channel_id="C1",
+                message_text=f"Message {i}"))
+        _db.session.commit()
+
+    http_server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{http_server.server_port}"
+
+    http_server.shutdown()
+
+
+def test_client_iterates_all_pages(server):
+    with VibeMeterClient(base_url=server) as client:
+        messages = list(client.iter_messages(page_size=10))
+        assert len(messages) == 25
+        assert len({m["id"] for m in messages}) == 25
+
+        assert len(list(client.iter_messages(page_size=5, user_id="U1"))) == 12
+        assert len(list(client.iter_messages(page_size=10, max_messages=15))) == 15
+
+
+@patch('app.api.routes.send_message')
+def test_client_send_many(mock_send, server):
+    mock_send.return_value = {"ok": True}
+
+    with VibeMeterClient(base_url=server) as client:
+        results = client.send_many(
+            [{"user_id": f"U{i}", "text": "How are you?"} for i in range(5)])
+        assert all(result["success"] for result in results)
+        assert mock_send.call_count == 5
+
+        # Failed sends are reported, not retried
+        mock_send.return_value = None
+        with pytest.raises(VibeMeterAPIError) as error:
+            client.send_message(user_id="U1", text="Hi")
+        assert error.value.status_code == 500
+        assert mock_send.call_count == 6
+
+
+@patch('app.api.routes.send_message')
+def test_async_client(mock_send, server):
+    pytest.importorskip("aiohttp")
+    from vibemeter_client import AsyncVibeMeterClient
+
+    mock_send.return_value = {"ok": True}
+
+    async def run():
+        async with AsyncVibeMeterClient(base_url=server) as client:
+            messages = [m async for m in client.iter_messages(page_size=10)]
+            results = await client.send_many(
+                [{"user_id": "U1", "text": "Hi"}, {"user_id": "U2", "text": "Hi"}])
+            return messages, results
+
+    messages, results = asyncio.run(run())
+    assert len(messages) == 25
+    assert [result["success"] for result in results] == [True, True]
+
+
+def test_sync_client_imports_without_aiohttp(monkeypatch):
+    import importlib
+    import sys
+
+    for name in [m for m in sys.modules if m.split(".")[0] == "vibemeter_client"]:
+        monkeypatch.delitem(sys.modules, name)
+    monkeypatch.setitem(sys.modules, "aiohttp", None)
+
+    sdk = importlib.import_module("vibemeter_client")
+    assert sdk.VibeMeterClient.__name__ == "VibeMeterClient"
+    with pytest.raises(ImportError):
+        sdk.AsyncVibeMeterClient
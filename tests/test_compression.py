@@ -0,0 +1,190 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from app.database import compression
+from app.database.compression import (
+    codec, train_dictionary, recompress_messages, decompress_messages,
+    prune_dictionaries
+)
+from app.database.db import db as _db, Message, CompressionDictionary
+
+pytest.importorskip("zstandard")
+
+
+@pytest.fixture(autouse=True)
+def reset_codec():
+    yield
+    codec.configure(False)
+
+
+def pulse_text(rng, i):
+    greeting = rng.choice(["Hi", "Hey", "Good morning", "Hello"])
+    return (f"{greeting} <@U{i:05d}>! How are you feeling about the sprint this week? "
+            f"Reply with a number from 1 to {rng.randint(5, 10)}.")
+
+
+def store(count, rng, direction="outgoing", first=0):
+    for i in range(first, first + count):
+        _db.session.add(Message(
+            user_id=f"U{i:05d}", channel_id="C1", message_text=pulse_text(rng, i),
+            message_metadata={"slack_ts": f"{1700000000 + i}.000100",
+                              "direction": direction},
+            direction=direction))
+    _db.session.commit()
+
+
+def raw_rows():
+    return _db.session.execute(_db.text(
+        "SELECT message_text = '', typeof(compressed_text), "
+        "typeof(compressed_metadata), compression_dict_id "
+        "FROM messages ORDER BY id")).all()
+
+
+def test_rows_stay_plain_until_a_dictionary_exists(make_app):
+    app = make_app(MESSAGE_COMPRESSION=True)
+    rng = random.Random(1)
+
+    with app.app_context():
+        store(150, rng)
+        assert set(raw_rows()) == {(0, "null", "null", None)}
+
+        dictionary = train_dictionary(sample_size=150, dict_size=4096)
+        store(5, rng, first=150)
+        assert set(raw_rows()[150:]) == {(1, "blob", "blob", dictionary.id)}
+
+        message = Message.query.order_by(Message.id.desc()).first()
+        _db.session.expire_all()
+        entry = _db.session.get(Message, message.id).to_dict()
+        assert entry["message_text"].startswith(("Hi", "Hey", "Good", "Hello"))
+        assert entry["metadata"]["direction"] == "outgoing"
+
+    client = app.test_client()
+    response = client.get('/api/messages?direction=outgoing&limit=200')
+    assert len(response.get_json()["messages"]) == 155
+    response = client.get('/api/messages?direction=incoming')
+    assert response.get_json()["messages"] == []
+
+
+def test_retrain_recompresses_plain_rows_and_prunes(app):
+    rng = random.Random(2)
+
+    with app.app_context():
+        store(300, rng)
+        expected = [m.message_text for m in Message.query.order_by(Message.id)]
+        assert {row[3] for row in raw_rows()} == {None}
+
+        # Switch compression on for the existing plain rows
+        codec.configure(True)
+        first = train_dictionary(sample_size=300, dict_size=4096)
+        assert first is not None and codec.current_id == first.id
+
+        before = datetime.utcnow() + timedelta(seconds=1)
+        assert recompress_messages(before, batch_size=64) == 300
+        assert {row[3] for row in raw_rows()} == {first.id}
+        assert recompress_messages(before) == 0
+
+        second = train_dictionary(sample_size=300, dict_size=4096)
+        assert recompress_messages(before, batch_size=64) == 300
+
+        # A worker still on the first dictionary leaves newer rows alone
+        codec.add_dictionary(first.id, first.data, current=True)
+        assert recompress_messages(before) == 0
+        codec.add_dictionary(second.id, second.data, current=True)
+
+        assert prune_dictionaries() == 1
+        assert [d.id for d in CompressionDictionary.query] == [second.id]
+
+        # A fresh cache must load the dictionary back from the database
+        codec.configure(True)
+        _db.session.expire_all()
+        assert [m.message_text for m in Message.query.order_by(Message.id)] == expected
+
+
+def test_concurrent_training_keeps_one_dictionary(app):
+    from unittest.mock import patch
+
+    with app.app_context():
+        store(150, random.Random(5))
+        codec.configure(True)
+        first = train_dictionary(sample_size=150, dict_size=4096)
+
+        # Skipped while the newest dictionary is fresh
+        assert train_dictionary(sample_size=150, dict_size=4096, max_age=3600) is None
+
+        # Another worker stores its replacement for the first dictionary while
+        # this one is still training
+        real_train = compression.zstandard.train_dictionary
+
+        def train_while_other_worker_commits(*args):
+            _db.session.add(CompressionDictionary(data=first.data, replaces_id=first.id))
+            _db.session.commit()
+            return real_train(*args)
+
+        with patch.object(compression.zstandard, 'train_dictionary',
+                          side_effect=train_while_other_worker_commits):
+            assert train_dictionary(sample_size=150, dict_size=4096) is None
+
+        other = CompressionDictionary.query.filter_by(replaces_id=first.id).one()
+        assert CompressionDictionary.query.count() == 2
+        assert codec.current_id == other.id
+
+
+def test_train_skips_small_samples(make_app):
+    app = make_app(MESSAGE_COMPRESSION=True)
+
+    with app.app_context():
+        store(10, random.Random(3))
+        assert train_dictionary() is None
+        assert CompressionDictionary.query.count() == 0
+
+
+def test_switching_compression_off_decompresses(tmp_path):
+    from app import create_app
+
+    config = {'TESTING': True, 'MESSAGE_COMPRESSION': True,
+              'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "compressed.db"}',
+              'TRENDS_CHECKPOINT_INTERVAL': 0, 'COMPRESSION_JOB_INTERVAL': 0}
+    app = create_app(config)
+
+    with app.app_context():
+        store(150, random.Random(4))
+        train_dictionary(sample_size=150, dict_size=4096)
+        recompress_messages(datetime.utcnow() + timedelta(seconds=1))
+        expected = [m.to_dict() for m in Message.query.order_by(Message.id)]
+        _db.session.remove()
+
+    # Compressed rows must not silently become unreadable
+    compression.zstandard, zstandard = None, compression.zstandard
+    try:
+        with pytest.raises(RuntimeError, match="zstandard"):
+            create_app(config)
+    finally:
+        compression.zstandard = zstandard
+
+    app = create_app(dict(config, MESSAGE_COMPRESSION=False))
+    with app.app_context():
+        assert [m.to_dict() for m in Message.query.order_by(Message.id)] == expected
+
+        assert app.extensions['compression_job'].run() == 150
+        assert {row[3] for row in raw_rows()} == {None}
+        assert CompressionDictionary.query.count() == 0
+
+        _db.session.expire_all()
+        assert [m.to_dict() for m in Message.query.order_by(Message.id)] == expected
+        _db.session.remove()
+
+
+def test_job_trains_once_per_interval(make_app):
+    app = make_app(MESSAGE_COMPRESSION=True)
+    job = compression.CompressionJob(app)
+    job.interval = 3600
+
+    with app.app_context():
+        store(150, random.Random(5))
+
+    job.run()
+    job.run()
+
+    with app.app_context():
+        assert CompressionDictionary.query.count() == 1
+        assert codec.current_id == CompressionDictionary.query.one().id
@@ -0,0 +1,35 @@
+import sqlite3
+from app.database.db import db, Message
+
+
+def test_upgrade_schema_adds_new_columns(make_app, tmp_path):
+    # A messages table as created by the first release
+    path = tmp_path / "old.db"
+    connection = sqlite3.connect(path)
+    connection.execute("""
+        CREATE TABLE messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            channel_id TEXT NOT NULL,
+            message_text TEXT NOT NULL,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            message_metadata JSON
+        )""")
+    connection.execute("INSERT INTO messages (user_id, channel_id, message_text) "
+                       "VALUES ('U1', 'C1', 'old message')")
+    connection.commit()
+    connection.close()
+
+    app = make_app(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}')
+
+    with app.app_context():
+        db.session.add(Message(user_id='U2', channel_id='C1', message_text='new',
+                               thread_ts='1.0', direction='incoming'))
+        db.session.commit()
+
+        messages = Message.query.order_by(Message.id).all()
+        assert [m.message_text for m in messages] == ['old message', 'new']
+        assert messages[0].thread_ts is None and messages[1].thread_ts == '1.0'
+
+        indexes = {index['name'] for index in db.inspect(db.engine).get_indexes('messages')}
+        assert 'ix_messages_channel_thread' in indexes
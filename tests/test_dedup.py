@@ -0,0 +1,74 @@
+import json
+import pytest
+from app.database.db import db, Message
+from app.dedup import MinHasher, LSHIndex, duplicate_detector
+from app.dedup.minhash import normalize
+
+
+ANNOUNCEMENT = "Reminder: the all hands meeting moved to 3pm in the main room, please join on time"
+
+
+def test_lsh_index_matches_near_duplicates_within_window():
+    hasher = MinHasher()
+    index = LSHIndex(window=60, max_entries=3)
+
+    def sig(text):
+        return hasher.signature(normalize(text))
+
+    assert index.query_and_add(sig(ANNOUNCEMENT), 1, now=0) is None
+    assert index.query_and_add(
+        sig(ANNOUNCEMENT.replace("3pm", "4pm") + "!"), 2, now=10) == 1
+    assert index.query_and_add(
+        sig("Completely unrelated message about lunch plans today"), 3, now=20) is None
+
+    # Matches refresh the cluster; idle clusters fall out of the window
+    assert index.query_and_add(sig(ANNOUNCEMENT), 4, now=65) == 1
+    assert index.query_and_add(sig(ANNOUNCEMENT), 5, now=200) is None
+    assert len(index) == 1
+
+
+def test_ingest_tags_clusters_and_collapses(app):
+    from app.slack.events import handle_message
+
+    with app.app_context():
+        for i, user in enumerate(["U1", "U2", "U3"]):
+            handle_message({"event": {
+                "channel": "C1", "user": user, "ts": f"{1000 + i}.0",
+                "text": f"<@{user}> {ANNOUNCEMENT}"}})
+        handle_message({"event": {
+            "channel": "C1", "user": "U4", "ts": "1010.0",
+            "text": "Does anyone have the slides from yesterday's review?"}})
+
+        messages = Message.query.order_by(Message.id).all()
+        assert [m.cluster_id for m in messages] == [None, 1, 1, None]
+
+    client = app.test_client()
+    data = json.loads(client.get('/api/messages?collapse_duplicates=true').data)
+    assert data["count"] == 2
+    counts = sorted(m["duplicate_count"] for m in data["messages"])
+    assert counts == [1, 3]
+
+    data = json.loads(client.get('/api/messages').data)
+    assert data["count"] == 4
+
+    metrics = duplicate_detector.flood_metrics("C1", now=1020)["C1"]
+    assert metrics["messages"] == 4
+    assert metrics["duplicates"] == 2
+    assert metrics["top_clusters"] == [{"cluster_id": 1, "duplicates": 2}]
+
+
+def test_rolled_back_message_is_not_remembered(app):
+    from unittest.mock import patch
+    from app.slack.events import handle_message
+
+    event = {"event": {"channel": "C1", "user": "U1", "ts": "1000.0",
+                       "text": ANNOUNCEMENT}}
+
+    with app.app_context():
+        with patch("app.slack.events.scan_message", side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError):
+                handle_message(event)
+        db.session.rollback()
+
+        handle_message(event)
+        assert [m.cluster_id for m in Message.query.all()] == [None]
@@ -0,0 +1,39 @@
+import json
+import logging
+from app.logs import JsonFormatter, SamplingFilter
+
+
+def make_record(event=None, level=logging.INFO, **fields):
+    record = logging.makeLogRecord({
+        "name": "app.test", "levelno": level,
+        "levelname": logging.getLevelName(level), "msg": "Stored message"})
+    record.event = event
+    record.fields = fields
+    return record
+
+
+def test_json_formatter_redacts_message_text():
+    formatter = JsonFormatter(redact_fields=("message_text",))
+    entry = json.loads(formatter.format(
+        make_record("message.stored", user_id="U1", message_text="I am tired")))
+
+    assert entry["event"] == "message.stored"
+    assert entry["user_id"] == "U1"
+    assert entry["message_text"] == "[redacted 10 chars]"
+    assert "I am tired" not in formatter.format(
+        make_record("message.stored", message_text="I am tired"))
+
+
+def test_sampling_filter_rate_limits_per_event():
+    sampling_filter = SamplingFilter(
+        sampling={"message.sent": 0}, rate_limits={"message.stored": 5})
+
+    kept = sum(sampling_filter.filter(make_record("message.stored"))
+               for _ in range(50))
+    assert kept == 5
+    assert sampling_filter.dropped["message.stored"] == 45
+
+    # Sampled out entirely, but warnings and untagged records always pass
+    assert not sampling_filter.filter(make_record("message.sent"))
+    assert sampling_filter.filter(make_record("message.sent", logging.WARNING))
+    assert sampling_filter.filter(make_record())
@@ -0,0 +1,178 @@
+import pytest
+from app.database.db import db as _db
+from app.scheduler import CampaignScheduler, CronSchedule
+from datetime import datetime
+import json
+from unittest.mock import patch
+
+
+@pytest.fixture
+def app_config():
+    return {'SCHEDULER_SEND_RATE': 1000, 'SCHEDULER_WORKERS': 1, 'SCHEDULER_CHUNK_SIZE': 2}
+
+
+def run_until_idle(scheduler):
+    """Tick until no run has work ready, as the scheduler loop does"""
+    while scheduler.tick() and not scheduler._stop.is_set():
+        pass
+
+
+def test_cron_schedule():
+    schedule = CronSchedule("30 9 * * 1-5")
+    # Friday 2024-03-01 10:00 -> Monday 2024-03-04 09:30
+    assert schedule.next_after(datetime(2024, 3, 1, 10, 0)) == \
+        datetime(2024, 3, 4, 9, 30)
+    assert CronSchedule("*/15 * * * *").next_after(
+        datetime(2024, 3, 1, 10, 7)) == datetime(2024, 3, 1, 10, 15)
+    assert CronSchedule("@monthly").next_after(
+        datetime(2024, 12, 5)) == datetime(2025, 1, 1, 9, 0)
+
+    with pytest.raises(ValueError):
+        CronSchedule("61 * * * *")
+    with pytest.raises(ValueError):
+        CronSchedule("* * *")
+
+
+def test_campaign_validation(client):
+    response = client.post('/api/campaigns', json={
+        "name": "Pulse", "message_template": "Hi",
+        "audience": {"type": "everyone"}})
+    assert response.status_code == 400
+
+    response = client.post('/api/campaigns', json={
+        "name": "Pulse", "message_template": "Hi",
+        "audience": {"type": "users", "user_ids": ["U1"]},
+        "schedule": "not a schedule"})
+    assert response.status_code == 400
+
+
+@patch('app.scheduler.engine.send_message')
+def test_campaign_fan_out_resumes(mock_send, app, client):
+    sent = []
+
+    def fake_send(user_id, text):
+        sent.append((user_id, text))
+        # send_message commits on success, which checkpoints the delivery
+        _db.session.commit()
+        return {"ok": True}
+
+    mock_send.side_effect = fake_send
+
+    response = client.post('/api/campaigns', json={
+        "name": "Pulse",
+        "message_template": "Hi <@$user_id>, how are you?",
+        "audience": {"type": "users", "user_ids": ["U1", "U2", "U3", "U4", "U5"]}
+    })
+    assert response.status_code == 201
+    campaign_id = json.loads(response.data)["id"]
+
+    scheduler = CampaignScheduler(app)
+
+    # Stop after the second send to simulate a crash mid-campaign
+    def crash_after_two(user_id, text):
+        result = fake_send(user_id, text)
+        if len(sent) == 2:
+            scheduler._stop.set()
+        return result
+
+    mock_send.side_effect = crash_after_two
+    run_until_idle(scheduler)
+    assert [user_id for user_id, _ in sent] == ["U1", "U2"]
+
+    # A fresh scheduler picks up exactly where the last one stopped
+    mock_send.side_effect = fake_send
+    run_until_idle(CampaignScheduler(app))
+
+    assert [user_id for user_id, _ in sent] == ["U1", "U2", "U3", "U4", "U5"]
+    assert sent[0][1] == "Hi <@U1>, how are you?"
+
+    data = json.loads(client.get(f'/api/campaigns/{campaign_id}').data)
+    assert data["active"] is False
+    assert data["runs"][0]["status"] == "completed"
+    assert data["runs"][0]["deliveries"] == {"sent": 5}
+
+
+@patch('app.scheduler.engine.send_message')
+def test_campaign_failed_send_is_retried(mock_send, app, client):
+    mock_send.return_value = None
+
+    client.post('/api/campaigns', json={
+        "name": "Pulse", "message_template": "Hi",
+        "audience": {"type": "users", "user_ids": ["U1"]}})
+    run_until_idle(CampaignScheduler(app))
+
+    with app.app_context():
+        from app.database.db import CampaignDelivery, CampaignRun
+        delivery = CampaignDelivery.query.one()
+        assert delivery.status == "pending"
+        assert delivery.attempts == 1
+        assert delivery.next_attempt_at is not None
+        assert CampaignRun.query.one().status == "running"
+
+
+@patch('app.scheduler.engine.send_message')
+def test_campaign_worker_error_is_recorded(mock_send, app, client):
+    client.post('/api/campaigns', json={
+        "name": "Pulse", "message_template": "Hi",
+        "audience": {"type": "users", "user_ids": ["U1"]}})
+
+    with patch('app.scheduler.engine.string.Template', side_effect=RuntimeError("boom")):
+        run_until_idle(CampaignScheduler(app))
+
+    with app.app_context():
+        from app.database.db import CampaignDelivery
+        delivery = CampaignDelivery.query.one()
+        assert delivery.status == "pending"
+        assert delivery.error == "boom"
+        assert not mock_send.called
+
+
+def test_one_shot_campaign_waits_for_busy_run(app, client):
+    from app.database.db import Campaign, CampaignRun
+
+    client.post('/api/campaigns', json={
+        "name": "Pulse", "message_template": "Hi",
+        "audience": {"type": "users", "user_ids": ["U1"]}})
+
+    with app.app_context():
+        campaign = Campaign.query.one()
+        _db.session.add(CampaignRun(campaign_id=campaign.id))
+        _db.session.commit()
+
+        CampaignScheduler(app)._fire_due_campaigns()
+
+        campaign = Campaign.query.one()
+        assert campaign.active is True and campaign.next_run_at is not None
+        assert CampaignRun.query.count() == 1
+
+
+@patch('app.scheduler.engine.send_message')
+def test_long_run_does_not_hold_up_other_campaigns(mock_send, app, client):
+    from app.database.db import CampaignRun
+
+    # send_message commits on success, which checkpoints the delivery
+    mock_send.side_effect = lambda user_id, text: _db.session.commit() or {"ok": True}
+
+    client.post('/api/campaigns', json={
+        "name": "Big", "message_template": "Hi",
+        "audience": {"type": "users", "user_ids": [f"U{i}" for i in range(10)]}})
+
+    scheduler = CampaignScheduler(app)
+    assert scheduler.tick() is True  # fires and expands the first chunk
+    assert scheduler.tick() is True  # sends one slice
+    assert mock_send.call_count == 2
+
+    # A campaign created mid-run fires on the next tick
+    client.post('/api/campaigns', json={
+        "name": "Small", "message_template": "Hi",
+        "audience": {"type": "users", "user_ids": ["U99"]}})
+    scheduler.tick()
+
+    with app.app_context():
+        statuses = [run.status for run in CampaignRun.query.order_by(CampaignRun.id)]
+        assert statuses == ["running", "running"]
+
+    run_until_idle(scheduler)
+    assert mock_send.call_count == 11
+    with app.app_context():
+        assert {run.status for run in CampaignRun.query} == {"completed"}
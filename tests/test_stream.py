@@ -0,0 +1,114 @@
+import json
+import pytest
+from app.stream import message_broker
+
+
+@pytest.fixture
+def app_config():
+    return {'STREAM_HEARTBEAT': 0.05, 'STREAM_BUFFER_SIZE': 3, 'STREAM_REPLAY_LIMIT': 3}
+
+
+def store(app, channel, user, ts, text="Hello"):
+    from app.slack.events import handle_message
+    with app.app_context():
+        handle_message({"event": {
+            "channel": channel, "user": user, "ts": ts, "text": text}})
+
+
+def read_events(stream, count):
+    """Read SSE chunks until count message/dropped events have arrived"""
+    events = []
+    while len(events) < count:
+        chunk = next(stream).decode()
+        if chunk.startswith("id:") or chunk.startswith("event: dropped"):
+            lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+            events.append(lines)
+    return events
+
+
+def test_stream_filters_and_resumes(app):
+    client = app.test_client()
+    store(app, "C1", "U1", "1.0")
+
+    response = client.get('/api/messages/stream?channel_id=C2&last_event_id=0',
+                          buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    stream = iter(response.response)
+    assert next(stream).decode().startswith("retry:")
+
+    store(app, "C1", "U1", "2.0")
+    store(app, "C2", "U2", "3.0", text="For C2")
+
+    event = read_events(stream, 1)[0]
+    assert event["event"] == "message"
+    assert json.loads(event["data"])["message_text"] == "For C2"
+    response.close()
+    assert not message_broker.has_subscribers()
+
+    # Resume from Last-Event-ID replays stored messages before going live
+    response = client.get('/api/messages/stream', headers={'Last-Event-ID': '1'},
+                          buffered=False)
+    stream = iter(response.response)
+    assert [e["id"] for e in read_events(stream, 2)] == ["2", "3"]
+    response.close()
+
+
+def test_slow_subscriber_is_dropped(app):
+    client = app.test_client()
+    response = client.get('/api/messages/stream', buffered=False)
+    stream = iter(response.response)
+    next(stream)
+
+    # Nobody reads while four messages arrive; the buffer holds three
+    for i in range(4):
+        store(app, "C1", "U1", f"{i + 1}.0")
+
+    assert not message_broker.has_subscribers()
+    event = read_events(stream, 1)[0]
+    assert event["event"] == "dropped"
+    response.close()
+
+
+def test_long_backlog_is_replayed_in_pages(app):
+    client = app.test_client()
+    for i in range(4):
+        store(app, "C1", "U1", f"{i + 1}.0")
+
+    response = client.get('/api/messages/stream?last_event_id=0', buffered=False)
+    stream = iter(response.response)
+    events = read_events(stream, 4)
+    assert [e.get("id") for e in events[:3]] == ["1", "2", "3"]
+    assert events[3]["event"] == "dropped"
+    assert events[3]["id"] == "3"
+    assert json.loads(events[3]["data"]) == {"last_event_id": 3}
+    response.close()
+
+    # The next page picks up where the first ended, then streams live
+    response = client.get('/api/messages/stream', headers={'Last-Event-ID': '3'},
+                          buffered=False)
+    stream = iter(response.response)
+    next(stream)
+    store(app, "C1", "U1", "5.0")
+    assert [e["id"] for e in read_events(stream, 2)] == ["4", "5"]
+    response.close()
+
+
+def test_replay_pages_only_hold_matching_messages(app):
+    from app.database.db import db, Message
+    client = app.test_client()
+    for i in range(4):
+        store(app, "C1", "U1", f"{i + 1}.0")
+    with app.app_context():
+        db.session.add(Message(user_id="U1", channel_id="C1", message_text="Sent",
+                               direction="outgoing",
+                               message_metadata={"direction": "outgoing"}))
+        db.session.commit()
+
+    # More incoming messages than a page must not push the outgoing one out
+    response = client.get('/api/messages/stream?direction=outgoing&last_event_id=0',
+                          buffered=False)
+    stream = iter(response.response)
+    assert next(stream).decode() == "retry: 50\n\n"
+    event = read_events(stream, 1)[0]
+    assert (event["event"], event["id"]) == ("message", "5")
+    response.close()
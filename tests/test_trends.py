@@ -0,0 +1,111 @@
+import json
+import time
+import pytest
+from app.database.db import TrendAnomaly, TrendState
+from app.trends import score_vibe, trend_tracker, checkpoint
+from app.trends.tracker import TrendTracker, restore_trends
+
+
+def test_score_vibe():
+    assert score_vibe("Great sprint, thanks everyone :tada:") == 1
+    assert score_vibe("so tired and stressed") == -1
+    assert score_vibe("not good, but the demo was awesome") == 0
+    assert score_vibe("4") == 0.5
+    assert score_vibe(" 1/5 ") == -1
+    assert score_vibe("The deploy is at 3pm") is None
+
+
+def test_tracker_raises_one_drop_and_rearms():
+    tracker = TrendTracker(min_samples=5)
+    start = 1700000000
+
+    def post(i, vibe):
+        return [a for a in tracker.observe("U1", "C1", vibe, start + i * 600)
+                if a["metric"] == "vibe"]
+
+    assert not any(post(i, 0.8) for i in range(20))
+
+    drops = [post(20 + i, -0.8) for i in range(5)]
+    raised = [a for batch in drops for a in batch]
+    assert {(a["scope"], a["entity_id"]) for a in raised} == {("user", "U1"), ("channel", "C1")}
+    assert len(raised) == 2 and raised[0]["value"] < raised[0]["baseline"] - 0.3
+    assert tracker.state("user", "U1")["vibe"]["dropped"]
+
+    # Recovering re-arms the detector
+    for i in range(10):
+        post(25 + i, 0.8)
+    assert not tracker.state("user", "U1")["vibe"]["dropped"]
+
+
+def test_sweep_detects_silence():
+    tracker = TrendTracker(min_samples=5)
+    start = 1700000000
+    for i in range(30):
+        tracker.observe("U1", "C1", None, start + i * 60)
+
+    assert tracker.sweep(start + 30 * 60) == []
+    silent = tracker.sweep(start + 30 * 60 + 86400)
+    assert {(a["scope"], a["metric"]) for a in silent} == {
+        ("user", "activity"), ("channel", "activity")}
+    assert tracker.sweep(start + 30 * 60 + 2 * 86400) == []
+
+
+def test_handle_message_anomalies_and_checkpoint(app):
+    from app.slack.events import handle_message
+
+    start = int(time.time()) - 86400
+    texts = ["Feeling great today, love this team"] * 15 + ["ugh, exhausted and stressed"] * 4
+
+    with app.app_context():
+        for i, text in enumerate(texts):
+            handle_message({"event": {
+                "channel": "C1", "user": "U1", "ts": f"{start + i * 600}.000100",
+                "text": text}})
+
+        assert TrendAnomaly.query.filter_by(metric="vibe").count() == 2
+
+        # The posts are a day old, so the sweep also flags the silence since
+        assert checkpoint() == 2
+        assert TrendState.query.count() == 2
+        assert TrendAnomaly.query.filter_by(metric="activity").count() == 2
+        state = trend_tracker.state("user", "U1")
+
+        # A restart restores the same state
+        trend_tracker.configure(0.05, 0.3, 2.0, 10)
+        assert trend_tracker.state("user", "U1") is None
+        assert restore_trends() == 2
+        assert trend_tracker.state("user", "U1") == state
+
+    client = app.test_client()
+    data = json.loads(client.get('/api/trends/anomalies?scope=user&metric=vibe').data)
+    assert data["count"] == 1
+    assert data["anomalies"][0]["entity_id"] == "U1"
+    assert data["anomalies"][0]["message_id"] is not None
+
+    response = client.get('/api/trends/user/U1')
+    assert response.status_code == 200
+    assert json.loads(response.data)["vibe"]["dropped"] is True
+    assert client.get('/api/trends/user/U404').status_code == 404
+    assert client.get('/api/trends/team/U1').status_code == 400
+
+
+def test_rolled_back_and_redelivered_events_count_once(app):
+    from unittest.mock import patch
+    from app.database.db import db, Message
+    from app.slack.events import handle_message
+
+    event = {"event_id": "Ev1", "event": {
+        "channel": "C1", "user": "U1", "ts": f"{int(time.time())}.000100",
+        "text": "Feeling great today"}}
+
+    with app.app_context():
+        with patch("app.slack.events.scan_message", side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError):
+                handle_message(event)
+        db.session.rollback()
+        assert trend_tracker.state("user", "U1") is None
+
+        handle_message(event)
+        handle_message(event)
+        assert Message.query.filter_by(event_id="Ev1").count() == 1
+        assert trend_tracker.state("user", "U1")["vibe"]["samples"] == 1
@@ -0,0 +1,12 @@
+"""
+Client SDK for the VibeMeter Slack Bot API
+"""
+from vibemeter_client.client import VibeMeterClient, VibeMeterAPIError
+
+
+def __getattr__(name):
+    # The asyncio client needs aiohttp; import it only when it is asked for
+    if name == "AsyncVibeMeterClient":
+        from vibemeter_client.aio import AsyncVibeMeterClient
+        return AsyncVibeMeterClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
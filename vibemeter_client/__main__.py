@@ -0,0 +1,4 @@
+import sys
+from vibemeter_client.cli import main
+
+sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Asyncio client for the VibeMeter API
+"""
+import asyncio
+import os
+import aiohttp
+from vibemeter_client.client import (
+    DEFAULT_BASE_URL, RETRY_STATUSES, VibeMeterAPIError, _message_filters
+)
+
+
+class AsyncVibeMeterClient:
+    """
+    Asyncio counterpart of VibeMeterClient for high-concurrency consumers
+
+    Uses one aiohttp session with a bounded keep-alive connection pool. Retry
+    behaviour matches the synchronous client: GETs retry on connection errors,
+    429 and 5xx; sends retry only when the connection could not be made.
+
+    Args:
+        base_url (str, optional): The app's base URL. Defaults to $VIBEMETER_API_URL
+            or http://localhost:5000
+        timeout (float): Per-request timeout in seconds
+        max_retries (int): Retries per request
+        backoff_factor (float): Base delay in seconds for exponential backoff
+        pool_size (int): Maximum concurrent connections to the API
+    """
+
+    def __init__(self, base_url=None, timeout=10, max_retries=3,
+                 backoff_factor=0.5, pool_size=100):
+        self.base_url = (base_url or os.environ.get(
+            "VIBEMETER_API_URL", DEFAULT_BASE_URL)).rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def session(self):
+        # Created lazily so the session binds to the running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=self.timeout
+            )
+        return self._session
+
+    async def close(self):
+        """Close all pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response else None
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        return self.backoff_factor * 2 ** attempt
+
+    async def _request(self, method, path, **kwargs):
+        url = f"{self.base_url}{path}"
+        idempotent = method == "GET"
+
+        for attempt in range(self.max_retries + 1):
+            last_try = attempt == self.max_retries
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    if idempotent and response.status in RETRY_STATUSES and not last_try:
+                        await asyncio.sleep(self._delay(attempt, response))
+                        continue
+
+                    try:
+                        body = await response.json()
+                    except (aiohttp.ContentTypeError, ValueError):
+                        body = await response.text()
+
+                    if response.status >= 400:
+                        raise VibeMeterAPIError(response.status, body)
+                    return body
+
+            except aiohttp.ClientConnectorError:
+                if last_try:
+                    raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if last_try or not idempotent:
+                    raise
+
+            await asyncio.sleep(self._delay(attempt))
+
+    async def get_messages(self, limit=100, offset=0, **filters):
+        """
+        Fetch one page of messages
+
+        Returns:
+            dict: The API response with "count" and "messages"
+        """
+        params = dict(_message_filters(**filters), limit=limit, offset=offset)
+        return await self._request("GET", "/api/messages", params=params)
+
+    async def iter_messages(self, page_size=100, max_messages=None, **filters):
+        """
+        Asynchronously iterate over every matching message, newest first
+
+        Yields:
+            dict: One message at a time
+        """
+        offset = 0
+        yielded = 0
+        previous_ids = set()
+
+        while True:
+            page = await self.get_messages(limit=page_size, offset=offset, **filters)
+            messages = page["messages"]
+
+            for message in messages:
+                if message["id"] in previous_ids:
+                    continue
+                yield message
+                yielded += 1
+                if max_messages is not None and yielded >= max_messages:
+                    return
+
+            if len(messages) < page_size:
+                return
+
+            previous_ids = {message["id"] for message in messages}
+            offset += page_size
+
+    async def send_message(self, user_id, text, channel_id=None, thread_ts=None):
+        """
+        Send a message through the app
+
+        Returns:
+            dict: The API response
+        """
+        payload = {"user_id": user_id, "text": text}
+        if channel_id:
+            payload["channel_id"] = channel_id
+        if thread_ts:
+            payload["thread_ts"] = thread_ts
+
+        return await self._request("POST", "/api/send-message", json=payload)
+
+    async def send_many(self, messages, concurrency=20):
+        """
+        Send several messages concurrently
+
+        Args:
+            messages (iterable): Dicts of send_message keyword arguments
+            concurrency (int): Maximum sends in flight
+
+        Returns:
+            list: The API response, or the raised exception, for each message in order
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send(message):
+            async with semaphore:
+                return await self.send_message(**message)
+
+        return await asyncio.gather(
+            *(send(message) for message in messages), return_exceptions=True)
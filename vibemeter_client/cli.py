@@ -0,0 +1,99 @@
+"""
+Command line interface for the VibeMeter API
+
+Usage:
+    python -m vibemeter_client messages --user U12345678 --channel C12345678 --limit 20
+    python -m vibemeter_client messages --channel C12345678 --all
+    python -m vibemeter_client send --channel C12345678 --text "Hello from the CLI!"
+"""
+import argparse
+import sys
+import requests
+from dotenv import load_dotenv
+from vibemeter_client.client import VibeMeterClient, VibeMeterAPIError
+
+
+def display_message(msg):
+    """Print one message in a readable format"""
+    direction = (msg.get("metadata") or {}).get("direction", "unknown")
+    direction_icon = "→" if direction == "outgoing" else "←" if direction == "incoming" else "?"
+
+    print(f"{msg.get('timestamp')} {direction_icon} User: {msg.get('user_id')}")
+    print(f"Channel: {msg.get('channel_id')}")
+    print(f"Text: {msg.get('message_text')}")
+    print("-" * 60)
+
+
+def query_messages(client, args):
+    filters = {
+        "user_id": args.user,
+        "channel_id": args.channel,
+        "direction": args.direction,
+    }
+
+    if args.all:
+        messages = client.iter_messages(page_size=args.limit, **filters)
+    else:
+        messages = client.get_messages(
+            limit=args.limit, offset=args.offset, **filters)["messages"]
+
+    count = 0
+    print("-" * 60)
+    for msg in messages:
+        display_message(msg)
+        count += 1
+    print(f"Found {count} messages")
+
+
+def send(client, args):
+    if not args.user and not args.channel:
+        print("Error: You must specify either a user or a channel")
+        return 1
+
+    client.send_message(args.user or "", args.text, channel_id=args.channel,
+                        thread_ts=args.thread)
+    print("Message successfully sent via API")
+
+
+def main(argv=None):
+    """Main function to parse arguments and run a command"""
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(
+        prog="vibemeter_client", description="Query and send VibeMeter messages")
+    parser.add_argument("--api-url", help="Base URL of the VibeMeter app "
+                        "(default: $VIBEMETER_API_URL or http://localhost:5000)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    messages_parser = commands.add_parser("messages", help="Query stored messages")
+    messages_parser.add_argument("--user", help="Filter by user ID")
+    messages_parser.add_argument("--channel", help="Filter by channel ID")
+    messages_parser.add_argument(
+        "--direction", choices=["incoming", "outgoing"], help="Filter by message direction")
+    messages_parser.add_argument("--limit", type=int, default=10,
+                                 help="Maximum number of messages (page size with --all)")
+    messages_parser.add_argument("--offset", type=int, default=0,
+                                 help="Offset for pagination")
+    messages_parser.add_argument("--all", action="store_true",
+                                 help="Fetch every page of matching messages")
+    messages_parser.set_defaults(handler=query_messages)
+
+    send_parser = commands.add_parser("send", help="Send a message through the app")
+    send_parser.add_argument("--user", help="User ID to send the message to")
+    send_parser.add_argument("--channel", help="Channel ID to send the message to")
+    send_parser.add_argument("--thread", help="Thread ts to reply in")
+    send_parser.add_argument("--text", required=True, help="Message text to send")
+    send_parser.set_defaults(handler=send)
+
+    args = parser.parse_args(argv)
+
+    with VibeMeterClient(base_url=args.api_url) as client:
+        try:
+            return args.handler(client, args)
+        except (VibeMeterAPIError, requests.RequestException) as e:
+            print(f"Error: {e}")
+            return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
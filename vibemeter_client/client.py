@@ -0,0 +1,190 @@
+"""
+Synchronous client for the VibeMeter API
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BASE_URL = "http://localhost:5000"
+
+# Statuses worth retrying: rate limited or a transient server failure
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class VibeMeterAPIError(Exception):
+    """Raised when the API answers with an error status"""
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+        error = body.get("error") if isinstance(body, dict) else body
+        super().__init__(f"VibeMeter API error {status_code}: {error}")
+
+
+def _message_filters(user_id=None, channel_id=None, direction=None, expand=None):
+    params = {}
+    if user_id:
+        params["user_id"] = user_id
+    if channel_id:
+        params["channel_id"] = channel_id
+    if direction:
+        params["direction"] = direction
+    if expand:
+        params["expand"] = expand if isinstance(expand, str) else ",".join(expand)
+    return params
+
+
+class VibeMeterClient:
+    """
+    Client for /api/messages and /api/send-message over a pooled keep-alive session
+
+    GET requests are retried with exponential backoff on connection errors,
+    429 and 5xx responses (honouring Retry-After). Sends are only retried when
+    the connection could not be made, so a message is never posted twice.
+
+    Args:
+        base_url (str, optional): The app's base URL. Defaults to $VIBEMETER_API_URL
+            or http://localhost:5000
+        timeout (float): Per-request timeout in seconds
+        max_retries (int): Retries per request
+        backoff_factor (float): Base delay in seconds for exponential backoff
+        pool_size (int): Keep-alive connections kept open to the API
+    """
+
+    def __init__(self, base_url=None, timeout=10, max_retries=3,
+                 backoff_factor=0.5, pool_size=10):
+        self.base_url = (base_url or os.environ.get(
+            "VIBEMETER_API_URL", DEFAULT_BASE_URL)).rstrip("/")
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+    def _request(self, method, path, **kwargs):
+        response = self.session.request(
+            method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+
+        if response.status_code >= 400:
+            raise VibeMeterAPIError(response.status_code, body)
+        return body
+
+    def get_messages(self, limit=100, offset=0, **filters):
+        """
+        Fetch one page of messages
+
+        Args:
+            limit (int): Page size
+            offset (int): Offset for pagination
+            **filters: user_id, channel_id, direction and expand
+
+        Returns:
+            dict: The API response with "count" and "messages"
+        """
+        params = dict(_message_filters(**filters), limit=limit, offset=offset)
+        return self._request("GET", "/api/messages", params=params)
+
+    def iter_messages(self, page_size=100, max_messages=None, **filters):
+        """
+        Iterate over every matching message, fetching pages as needed
+
+        Messages stored while iterating shift later pages; messages already
+        yielded on the previous page are skipped so none is returned twice.
+
+        Args:
+            page_size (int): Messages per request
+            max_messages (int, optional): Stop after this many messages
+            **filters: user_id, channel_id, direction and expand
+
+        Yields:
+            dict: One message at a time, newest first
+        """
+        offset = 0
+        yielded = 0
+        previous_ids = set()
+
+        while True:
+            page = self.get_messages(limit=page_size, offset=offset, **filters)
+            messages = page["messages"]
+
+            for message in messages:
+                if message["id"] in previous_ids:
+                    continue
+                yield message
+                yielded += 1
+                if max_messages is not None and yielded >= max_messages:
+                    return
+
+            if len(messages) < page_size:
+                return
+
+            previous_ids = {message["id"] for message in messages}
+            offset += page_size
+
+    def send_message(self, user_id, text, channel_id=None, thread_ts=None):
+        """
+        Send a message through the app
+
+        Args:
+            user_id (str): The Slack user ID
+            text (str): The message text
+            channel_id (str, optional): The channel ID. If not provided, sends DM to user_id
+            thread_ts (str, optional): The ts of a thread root to reply in
+
+        Returns:
+            dict: The API response
+        """
+        payload = {"user_id": user_id, "text": text}
+        if channel_id:
+            payload["channel_id"] = channel_id
+        if thread_ts:
+            payload["thread_ts"] = thread_ts
+
+        return self._request("POST", "/api/send-message", json=payload)
+
+    def send_many(self, messages, max_workers=4):
+        """
+        Send several messages concurrently over the shared connection pool
+
+        Args:
+            messages (iterable): Dicts of send_message keyword arguments
+            max_workers (int): Concurrent requests
+
+        Returns:
+            list: The API response, or the raised exception, for each message in order
+        """
+        def send(message):
+            try:
+                return self.send_message(**message)
+            except (VibeMeterAPIError, requests.RequestException) as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(send, messages))